@@ -1,15 +1,27 @@
 import flet as ft
+import argparse
 import random
+import secrets
 import time
+import uuid
 from datetime import datetime, timedelta
 import os # NEW: Needed to check for the consent file
-import cv2  # NEW: For facial recognition
+from camera_service import camera  # Shared webcam
+from preview_encoder import PreviewEncoder  # Adaptive live-preview JPEG encoder
+from checkin_pipeline import CheckinJob, CheckinCancelled, StageTimeout, make_checkin_executors  # Check-in stages run off the UI thread
+from history_store import start_of_day  # Persistent mood history + baselines (emoboost.db)
+from user_state import DATA_DIR, acquire_user_state, release_user_state  # Per-user consent + history (one set per user in server mode)
+from detection_pool import DetectionPool, PoolBusy  # Shared face-detection worker processes for server mode
+from chart_series import MoodSeries  # Incremental, downsampled dashboard chart data
+from keystrokes import KeystrokeRecorder  # Per-keystroke typing telemetry + alignment-based error scoring
+from mood_engine import calibrate, classify_typing, detect_face, select_actions  # Headless mood logic
+from passive_monitor import PassiveMonitor  # Optional low-duty-cycle background mood monitoring
+import metrics  # Hot-path timers/counters (EMOBOOST_METRICS=1), shown on the hidden /diagnostics route
 
 # --- LIBRARIES FOR REAL AUTOMATION ---
 # Make sure you have run: pip install screen-brightness-control plyer
-import screen_brightness_control as sbc
 from plyer import notification
-import webbrowser
+from action_dispatcher import ActionDispatcher  # Queued, de-duplicated brightness/playlist/DND/notification actions
 
 # --- GLOBAL CONFIGURATION ---
 TYPING_TEST_SENTENCES = [
@@ -20,6 +32,33 @@ TYPING_TEST_SENTENCES = [
     "Two driven jocks help fax my big quiz.", "Crazy Fredrick bought many very exquisite opal jewels."
 ]
 
+# Face detector tuning (see face_detector.FaceDetector, used through mood_engine.detect_face)
+FACE_DETECTOR_SETTINGS = {"scale_factor": 1.3, "min_neighbors": 5, "detect_width": 320, "detect_every": 5, "stable_frames": 3}
+
+# Check-in stage timeouts (seconds)
+FACE_STAGE_TIMEOUT = 5.0
+ACTION_TIMEOUT = 5.0  # Per automation backend call
+
+# Dashboard chart limits
+CHART_POINT_BUDGET = 120  # Max data points drawn across all mood lines
+CHART_LABEL_WIDTH = 48  # Approx. pixels needed per "HH:MM" axis label
+
+# Passive monitoring (desktop only): average CPU share of one core and share of time with the camera open
+PASSIVE_MONITOR_SETTINGS = {"cpu_budget": 0.02, "camera_budget": 0.01, "min_interval": 60.0, "max_interval": 900.0}
+monitor_on_start = False  # --monitor
+
+# Where the diagnostics view dumps metrics
+METRICS_JSON_PATH = "emoboost-metrics.json"
+METRICS_PROMETHEUS_PATH = "emoboost-metrics.prom"
+
+# Server (multi-user web) mode, see the bottom of this file
+SERVER_PORT = 8550
+MAX_SESSIONS = 32  # Check-ins that can run at the same time; each needs a pipeline thread and a stage thread
+UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")  # Where browsers upload their check-in snapshots
+server_mode = False
+detection_pool = None  # Created when serving; shared by every session
+checkin_executors = {}  # Server mode: pools sized for MAX_SESSIONS (desktop uses checkin_pipeline's defaults)
+
 def randomise_typing_sentence():
     return random.choice(TYPING_TEST_SENTENCES)
 
@@ -31,6 +70,10 @@ mood_playlists = {
     
 }
 
+# Environment automation runs on its own worker (set EMOBOOST_BACKEND=fake to try it without real hardware).
+# Desktop mode only: in server mode it would act on the server's screen, not the user's.
+dispatcher = None
+
 def main(page: ft.Page):
     # --- App Setup ---
     colors = {
@@ -39,55 +82,42 @@ def main(page: ft.Page):
     }
     page.title = "Emoboost"; page.window_width = 420; page.window_height = 800; page.window_resizable = False; page.theme_mode = ft.ThemeMode.DARK; page.bgcolor = colors["background"]
     
-    # --- App Memory & Calibration State ---
-    mood_history = []
-    last_mood_result = None
-    baseline_wpm = 0.0
-    baseline_error_rate = 0.0
+    # --- Per-user State (server mode: one browser = one user id, kept in client storage) ---
+    user_id = None
+    if server_mode:
+        user_id = page.client_storage.get("emoboost.user_id")
+        if not user_id:
+            user_id = uuid.uuid4().hex; page.client_storage.set("emoboost.user_id", user_id)
+    user = acquire_user_state(user_id)
+    history = user.history
+
+    # --- App Memory & Calibration State (only today's check-ins are loaded for the dashboard) ---
+    mood_series = MoodSeries(history.today())
+    baseline = history.latest_baseline()
+    baseline_wpm, baseline_error_rate = baseline if baseline else (0.0, 0.0)
+    last_checkin = mood_series.entries[-1] if mood_series else history.last_checkin()
+    last_mood_result = last_checkin['mood'] if last_checkin else ("Calibrated" if baseline else None)
 
     def create_card(content):
         return ft.Container(content=content, bgcolor=colors["card_bg"], border_radius=12, padding=ft.padding.all(18))
 
-    # --- REAL AUTOMATION FUNCTIONS ---
-    def set_brightness(level):
-        try: sbc.set_brightness(level); print(f"Brightness set to {level}%")
-        except Exception as e: print(f"Could not control screen brightness. Error: {e}")
-
-    def send_real_notification(title, message):
-        try: notification.notify(title=title, message=message, app_name="Emoboost", timeout=10); print("OS notification sent.")
-        except Exception as e: print(f"Could not send OS notification. Error: {e}")
-
-    def open_mood_playlist(mood):
-        try:
-            playlist_url = mood_playlists.get(mood)
-            if playlist_url: webbrowser.open(playlist_url); print(f"Opening '{mood}' playlist in web browser.")
-        except Exception as e: print(f"Could not open playlist in browser. Error: {e}")
-
-    def recognize_mood_from_face():
+    def recognize_mood_from_face(cancel_event=None, deadline=None):
         """
         Attempts to recognize mood from facial expressions using the webcam.
-        Returns a string mood ("Happy", "Sad", "Neutral", etc.) or raises an error if no camera is found.
+        Returns a string mood ("Happy", "Sad", "Neutral", etc.) or None if no camera/face is found.
+        Stops early (returning None) once `cancel_event` is set or the monotonic `deadline` has passed.
         """
         try:
-            cap = cv2.VideoCapture(0)
-            if not cap.isOpened():
-                raise RuntimeError("No camera detected. Please connect a webcam to use facial mood recognition.")
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            mood = "Neutral"
-            detected = False
-            for _ in range(30):  # Try for ~1 second (30 frames)
-                ret, frame = cap.read()
-                if not ret:
-                    continue
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-                if len(faces) > 0:
-                    detected = True
-                    # Placeholder: In a real app, use a deep learning model for emotion detection here.
-                    mood = "Neutral"
-                    break
-            cap.release()
-            if not detected:
+            camera.acquire()  # Reuses the device if the live preview already has it open
+            should_stop = lambda: (cancel_event is not None and cancel_event.is_set()) or (deadline is not None and time.monotonic() > deadline)
+            try:
+                # Try for ~1 second (30 frames), stopping as soon as the face has been seen in a few consecutive frames
+                mood = detect_face(camera.frames(30), FACE_DETECTOR_SETTINGS, max_frames=30, should_stop=should_stop)
+            finally:
+                camera.release()
+            if mood is None and should_stop():
+                return None
+            if mood is None:
                 raise RuntimeError("Face not detected. Please ensure your face is visible to the camera.")
             return mood
         except Exception as e:
@@ -103,132 +133,230 @@ def main(page: ft.Page):
             print(f"Facial recognition error: {e}")
             return None
 
+    # --- Server mode: the browser uploads a snapshot, which the shared detection pool analyses ---
+    snapshot = {"path": None}
+    snapshot_status_ref = ft.Ref[ft.Text]()
+
+    def recognize_mood_from_snapshot():
+        """Returns the facial mood for the uploaded snapshot, or None. Raises PoolBusy when the server is saturated."""
+        path = snapshot["path"]
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f: image_bytes = f.read()
+        finally:
+            discard_snapshot()
+        return detection_pool.detect(image_bytes, timeout=FACE_STAGE_TIMEOUT)
+
+    def discard_snapshot():
+        """Deletes the uploaded snapshot, if any: it is only kept until the check-in it was taken for."""
+        path, snapshot["path"] = snapshot["path"], None
+        if path is None: return
+        try: os.remove(path)
+        except OSError: pass
+
+    def set_snapshot_status(message):
+        if snapshot_status_ref.current: snapshot_status_ref.current.value = message; page.update()
+
+    def on_snapshot_picked(e):
+        if not e.files: return
+        name = f"{user.user_id}-{uuid.uuid4().hex}{os.path.splitext(e.files[0].name)[1].lower()}"
+        snapshot["pending"] = name
+        set_snapshot_status("Uploading snapshot...")
+        snapshot_picker.upload([ft.FilePickerUploadFile(e.files[0].name, upload_url=page.get_upload_url(name, 600))])
+
+    def on_snapshot_uploaded(e):
+        if e.error:
+            pending = snapshot.pop("pending", None)
+            if pending:  # Remove whatever part of the file made it to the server
+                try: os.remove(os.path.join(UPLOAD_DIR, pending))
+                except OSError: pass
+            set_snapshot_status(f"Upload failed: {e.error}"); return
+        if e.progress is not None and e.progress >= 1.0:
+            pending = snapshot.pop("pending", None)
+            if pending is None: return  # Repeated completion event for an upload already handled
+            discard_snapshot()  # A newer snapshot replaces the previous one
+            snapshot["path"] = os.path.join(UPLOAD_DIR, pending)
+            set_snapshot_status("Snapshot ready.")
+
+    snapshot_picker = ft.FilePicker(on_result=on_snapshot_picked, on_upload=on_snapshot_uploaded)
+    if server_mode: page.overlay.append(snapshot_picker)
+
     # --- Check-in View ---
-    typing_field_ref = ft.Ref[ft.TextField](); typing_start_time = 0
+    typing_field_ref = ft.Ref[ft.TextField]()
     typing_test_text = randomise_typing_sentence()
+    keystrokes = KeystrokeRecorder(typing_test_text)
 
-    # Webcam video streaming for Flet (using OpenCV and base64)
+    # Webcam video streaming for Flet (OpenCV JPEG -> base64, see preview_encoder.py)
     import threading
-    import base64
-    from io import BytesIO
-    from PIL import Image
 
     webcam_image_ref = ft.Ref[ft.Image]()
-    webcam_running = {"active": False}
+    webcam_running = {"active": False, "generation": 0}
 
-    def webcam_stream_loop():
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            webcam_running["active"] = False
+    def webcam_stream_loop(generation):
+        # Opening the device can take hundreds of milliseconds, so it happens here rather than on the UI thread
+        try: camera.acquire()
+        except RuntimeError as e:
+            print(f"Webcam preview unavailable: {e}")
+            if webcam_running["generation"] == generation: webcam_running["active"] = False
             return
-        while webcam_running["active"]:
-            ret, frame = cap.read()
-            if not ret:
-                continue
-            # Convert frame to RGB and resize for UI
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame = cv2.resize(frame, (320, 240))
-            img_pil = Image.fromarray(frame)
-            buf = BytesIO()
-            img_pil.save(buf, format="JPEG")
-            img_bytes = buf.getvalue()
-            img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-            if webcam_image_ref.current:
-                webcam_image_ref.current.src_base64 = img_b64
-                webcam_image_ref.current.update()
-            time.sleep(0.05)
-        cap.release()
+        encoder = PreviewEncoder(size=(320, 240))
+        seq = 0
+        try:
+            # A newer start_webcam() bumps the generation, so a loop that is still winding down exits
+            while webcam_running["active"] and webcam_running["generation"] == generation:
+                item = camera.wait_frame(seq, timeout=0.5)
+                if item is None:
+                    if not camera.is_running: webcam_running["active"] = False; break
+                    continue
+                # Always take the newest frame; anything captured while we were busy is dropped, not queued
+                if seq and item[0] - seq > 1: encoder.dropped += item[0] - seq - 1; metrics.inc("preview_dropped_frames_total", item[0] - seq - 1)
+                seq, _, frame = item
+                started = time.perf_counter()
+                img_b64 = encoder.encode(frame, started)
+                if img_b64 is not None and webcam_image_ref.current:
+                    webcam_image_ref.current.src_base64 = img_b64
+                    with metrics.timer("page_update_seconds", source="preview"): webcam_image_ref.current.update()
+                    encoder.record_cost(time.perf_counter() - started)
+                time.sleep(max(0.0, encoder.frame_interval - (time.perf_counter() - started)))
+        except Exception as e:
+            print(f"Webcam preview error: {e}")
+            webcam_running["active"] = False
+        finally:
+            camera.release()
 
     def start_webcam():
+        if server_mode: return  # The server's camera is not the user's; browsers send snapshots instead
         if not webcam_running["active"]:
-            webcam_running["active"] = True
-            threading.Thread(target=webcam_stream_loop, daemon=True).start()
+            webcam_running["active"] = True; webcam_running["generation"] += 1
+            threading.Thread(target=webcam_stream_loop, args=(webcam_running["generation"],), daemon=True).start()
 
     def stop_webcam():
         webcam_running["active"] = False
 
-    def analyze_and_submit(e):
-        nonlocal typing_start_time, last_mood_result, baseline_wpm, baseline_error_rate, typing_test_text
-        stop_webcam()  # Stop webcam stream before facial recognition
-        # Activate facial recognition during check-in/calibration
-        face_mood = recognize_mood_from_face()
-        if face_mood is None:
-            page.snack_bar = ft.SnackBar(content=ft.Text("Facial recognition failed. Please check your camera."), bgcolor=colors["card_bg"])
-            page.snack_bar.open = True
-            page.update()
-            # Ask again for facial recognition during check-in
-            start_webcam()
-            face_mood_retry = recognize_mood_from_face()
+    # --- Check-in Pipeline (runs on the worker pool, see checkin_pipeline.py) ---
+    checkin_job = None
+    checkin_progress_ref = ft.Ref[ft.Row](); checkin_stage_ref = ft.Ref[ft.Text]()
+    typing_result_ref = ft.Ref[ft.Text](); face_result_ref = ft.Ref[ft.Text](); submit_button_ref = ft.Ref[ft.ElevatedButton]()
+
+    def show_snack(message):
+        page.snack_bar = ft.SnackBar(content=ft.Text(message), bgcolor=colors["card_bg"])
+        page.snack_bar.open = True
+        page.update()
+
+    def set_checkin_busy(busy, stage=""):
+        if not checkin_progress_ref.current: return
+        checkin_progress_ref.current.visible = busy; checkin_stage_ref.current.value = stage
+        submit_button_ref.current.disabled = busy
+        page.update()
+
+    def cancel_checkin():
+        discard_snapshot()
+        if checkin_job is not None and not checkin_job.done: checkin_job.cancel(); print("Check-in cancelled.")
+
+    def run_checkin_pipeline(job, mood, typing):
+        nonlocal checkin_job, last_mood_result, baseline_wpm, baseline_error_rate
+        try:
+            # Stage 1: facial recognition, with one retry, sharing the preview's camera feed
+            face_mood = None
+            if server_mode:
+                # One attempt on the uploaded snapshot; when the pool is full the check-in continues without it
+                try: face_mood = job.run_stage("Analyzing snapshot...", recognize_mood_from_snapshot, timeout=FACE_STAGE_TIMEOUT + 1)
+                except PoolBusy as e: show_snack(str(e))
+                except StageTimeout as e: print(f"Snapshot analysis timed out: {e}")
+                except Exception as e: print(f"Snapshot analysis error: {e}")
+                job.check()
+            for attempt in range(0 if server_mode else 2):
+                deadline = time.monotonic() + FACE_STAGE_TIMEOUT
+                try: face_mood = job.run_stage("Detecting face..." if attempt == 0 else "Retrying face detection...", recognize_mood_from_face, job.cancelled, deadline, timeout=FACE_STAGE_TIMEOUT + 1)
+                except StageTimeout as e: print(f"Facial recognition timed out: {e}")
+                job.check()
+                if face_mood is not None: break
+                show_snack("Facial recognition failed. Please check your camera." if attempt == 0 else "Facial recognition failed again. Skipping facial mood detection.")
             stop_webcam()
-            if face_mood_retry is None:
-                page.snack_bar = ft.SnackBar(content=ft.Text("Facial recognition failed again. Skipping facial mood detection."), bgcolor=colors["card_bg"])
-                page.snack_bar.open = True
-                page.update()
+            if face_result_ref.current:
+                face_result_ref.current.value = f"Face: {face_mood}" if face_mood else "Face: not detected"; page.update()
+            # Optionally, combine face_mood with typing mood here
+            wpm, error_rate = typing["wpm"], typing["error_rate"]
+            print(f"Analysis: WPM={wpm:.1f}, Error Rate={error_rate:.1f}%, Typing Mood={mood}, Facial Mood={face_mood}")
+            # Stage 2: commit the result (nothing is recorded if the user backed out before this point)
+            job.check()
+            now = datetime.now()
+            history.add_metrics("typing", typing, now)
+            history.add_metrics("face", {"detected": 1.0 if face_mood else 0.0}, now)
+            if mood == "Calibrated":
+                baseline_wpm, baseline_error_rate = calibrate(wpm, error_rate)
+                history.set_baseline(baseline_wpm, baseline_error_rate, now)
+                print(f"CALIBRATION COMPLETE: Baseline WPM={baseline_wpm:.1f}, Baseline Error Rate={baseline_error_rate:.1f}%")
             else:
-                face_mood = face_mood_retry
-        # Continue with typing analysis regardless of facial recognition result
-        typed_text = typing_field_ref.current.value or ""
-        end_time = time.time(); time_taken = end_time - typing_start_time if typing_start_time > 0 else 0
-        word_count = len(typed_text.split()); wpm = (word_count / time_taken * 60) if time_taken > 0 else 0
-        errors = sum(1 for i, char in enumerate(typed_text) if i >= len(typing_test_text) or char != typing_test_text[i])
-        error_rate = (errors / len(typing_test_text)) * 100 if typed_text else 0
-        mood = "Normal"
-        if baseline_wpm == 0:
-            baseline_wpm = wpm; baseline_error_rate = error_rate if error_rate > 0 else 1.0; mood = "Calibrated"
-            print(f"CALIBRATION COMPLETE: Baseline WPM={baseline_wpm:.1f}, Baseline Error Rate={baseline_error_rate:.1f}%")
-        else:
-            is_slower = wpm < baseline_wpm * 0.75; is_faster = wpm > baseline_wpm * 0.50
-            is_sloppy = error_rate > baseline_error_rate * 2 and error_rate > 5
-            is_accurate = error_rate < baseline_error_rate * 0.7
-            if is_slower and is_sloppy: mood = "Tired"
-            elif is_faster and is_sloppy: mood = "Stressed"
-            elif is_faster and is_accurate: mood = "Focused"
-        # Optionally, combine face_mood with typing mood here
-        print(f"Analysis: WPM={wpm:.1f}, Error Rate={error_rate:.1f}%, Typing Mood={mood}, Facial Mood={face_mood}")
-        if mood != "Calibrated": mood_history.append({'timestamp': datetime.now(), 'mood': mood, 'value': random.randint(1, 10)})
-        last_mood_result = mood
-        if mood == "Stressed":
-            set_brightness(30); open_mood_playlist("Stressed"); send_real_notification("Emoboost: Stress Detected", "We're dimming the lights and opening a calming playlist for you.")
-        elif mood == "Tired":
-            set_brightness(80); open_mood_playlist("Tired"); send_real_notification("Emoboost: Tiredness Detected", "Let's get some energy! Opening a playlist to wake you up.")
-        elif mood == "Focused":
-            open_mood_playlist("Focused")
-            try:
-                import subprocess; subprocess.run(["powershell", "-Command", "[Windows.UI.Notifications.Management.UserNotificationListener, Windows.Foundation.UniversalApiContract, ContentType=WindowsRuntime];$listener = [Windows.UI.Notifications.Management.UserNotificationListener]::Current;$listener.RequestAccessAsync() | Out-Null;[Windows.UI.Notifications.Management.UserNotificationListenerAccessStatus]::Allowed;New-ItemProperty -Path HKCU:\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Notifications\\Settings -Name NOC_GLOBAL_SETTING_TOASTS_ENABLED -Value 0 -PropertyType DWord -Force | Out-Null"], shell=True)
-                print("DND mode enabled (Windows Focus Assist).")
-            except Exception as e: print(f"Could not enable DND mode: {e}")
-            send_real_notification("Emoboost: Focus Mode", "DND (Focus Assist) enabled for your productivity.")
-        page.go("/")
+                entry = {'timestamp': now, 'mood': mood, 'value': random.randint(1, 10)}
+                mood_series.add(entry); history.add_checkin(now, mood, entry['value'], wpm, error_rate, face_mood)
+            last_mood_result = mood
+            refresh_dashboard(top=True, chart=mood != "Calibrated")
+            # Stage 3: environment automation is handed to the action dispatcher, which applies it in the background
+            if dispatcher is not None: dispatcher.submit(select_actions(mood))
+            else: print(f"Server mode: skipping environment actions for {mood}.")
+            checkin_job = None  # Finished: navigating home must not count as a cancellation
+            page.go("/")
+        except CheckinCancelled:
+            stop_webcam()
+        except Exception as e:
+            print(f"Check-in failed. Error: {e}")
+            show_snack("Check-in failed. Please try again.")
+        finally:
+            if page.route == "/checkin": set_checkin_busy(False)
 
-    def on_typing_start(e):
-        nonlocal typing_start_time
-        if typing_start_time == 0: typing_start_time = time.time()
+    def analyze_and_submit(e):
+        nonlocal checkin_job
+        if checkin_job is not None and not checkin_job.done: return
+        # Typing features were computed keystroke by keystroke, so the result is available immediately
+        with metrics.timer("typing_analysis_seconds", stage="submit"):
+            keystrokes.on_change(typing_field_ref.current.value)  # Make sure the final value is accounted for
+            typing = keystrokes.snapshot(); wpm, error_rate = typing["wpm"], typing["error_rate"]
+            mood = classify_typing(wpm, error_rate, baseline_wpm, baseline_error_rate)
+        typing_result_ref.current.value = f"Typing: {wpm:.0f} WPM, {error_rate:.0f}% errors, {typing['pauses']} pauses, {typing['backspace_rate']:.0%} backspaces -> {mood}"
+        face_result_ref.current.value = "Face: analyzing..."
+        set_checkin_busy(True, "Starting...")
+        checkin_job = CheckinJob(on_progress=lambda stage: set_checkin_busy(True, stage), **checkin_executors).start(run_checkin_pipeline, mood, typing)
+
+    def on_typing_change(e):
+        with metrics.timer("typing_analysis_seconds", stage="keystroke"): keystrokes.on_change(e.control.value)
 
     def create_checkin_view():
-        nonlocal typing_test_text
-        typing_test_text = randomise_typing_sentence()
+        nonlocal typing_test_text, keystrokes
+        typing_test_text = randomise_typing_sentence(); keystrokes = KeystrokeRecorder(typing_test_text)
         start_webcam()
+        if server_mode:
+            face_section = [
+                ft.Text("Facial Recognition (Snapshot)", weight=ft.FontWeight.BOLD),
+                ft.Text("Upload a photo of your face taken just now. It is analysed once and then deleted.", color=colors["text_secondary"], size=12),
+                ft.Row([ft.OutlinedButton("Upload snapshot", icon="photo_camera", on_click=lambda _: snapshot_picker.pick_files(allow_multiple=False, file_type=ft.FilePickerFileType.IMAGE)),
+                        ft.Text(ref=snapshot_status_ref, value="Snapshot ready." if snapshot["path"] else "No snapshot (optional).", size=12, color=colors["text_secondary"])]),
+            ]
+        else:
+            face_section = [
+                ft.Text("Facial Recognition (Live)", weight=ft.FontWeight.BOLD),
+                # FIX: Remove 'border' argument, keep only supported ones
+                ft.Image(
+                    ref=webcam_image_ref,
+                    width=320,
+                    height=240,
+                    fit=ft.ImageFit.CONTAIN,
+                    border_radius=8
+                ),
+                ft.Text("Please keep your face visible to the camera for mood detection.", color=colors["text_secondary"], size=12),
+            ]
         return ft.View(
             "/checkin",
             [
                 ft.AppBar(
                     title=ft.Text("First-Time Calibration" if baseline_wpm == 0 else "Mood Check-in"),
                     bgcolor=colors["background"],
-                    leading=ft.IconButton(icon="arrow_back_ios_new_rounded", tooltip="Go Back", on_click=lambda _: (stop_webcam(), page.go("/")))
+                    leading=ft.IconButton(icon="arrow_back_ios_new_rounded", tooltip="Go Back", on_click=lambda _: (cancel_checkin(), stop_webcam(), page.go("/")))
                 ),
                 ft.Column([
                     create_card(
-                        ft.Column([
-                            ft.Text("Facial Recognition (Live)", weight=ft.FontWeight.BOLD),
-                            # FIX: Remove 'border' argument, keep only supported ones
-                            ft.Image(
-                                ref=webcam_image_ref,
-                                width=320,
-                                height=240,
-                                fit=ft.ImageFit.CONTAIN,
-                                border_radius=8
-                            ),
-                            ft.Text("Please keep your face visible to the camera for mood detection.", color=colors["text_secondary"], size=12),
+                        ft.Column(face_section + [
                             ft.Divider(height=10, color="transparent"),
                             ft.Text("Typing Analysis", weight=ft.FontWeight.BOLD),
                             ft.Text(
@@ -236,50 +364,110 @@ def main(page: ft.Page):
                                 color=colors["text_secondary"], size=13
                             ),
                             ft.Text(f'"{typing_test_text}"', italic=True, size=14),
-                            ft.TextField(ref=typing_field_ref, multiline=True, min_lines=3, on_change=on_typing_start, border_color=colors["accent"]),
+                            ft.TextField(ref=typing_field_ref, multiline=True, min_lines=3, on_change=on_typing_change, border_color=colors["accent"]),
                         ])
                     ),
-                    ft.ElevatedButton("Analyze & Submit Mood", icon="science", on_click=analyze_and_submit, bgcolor=colors["accent"], color=colors["background"], height=50, expand=True)
+                    create_card(
+                        ft.Column([
+                            ft.Row([ft.ProgressRing(width=16, height=16, stroke_width=2, color=colors["accent"]), ft.Text(ref=checkin_stage_ref, size=13, color=colors["text_secondary"])], ref=checkin_progress_ref, visible=False),
+                            ft.Text(ref=typing_result_ref, value="Typing: waiting for submission", size=13),
+                            ft.Text(ref=face_result_ref, value="Face: waiting for submission", size=13),
+                        ], spacing=6)
+                    ),
+                    ft.ElevatedButton("Analyze & Submit Mood", ref=submit_button_ref, icon="science", on_click=analyze_and_submit, bgcolor=colors["accent"], color=colors["background"], height=50, expand=True)
                 ], spacing=15, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
             ]
         )
 
-    # --- Dashboard View ---
-    def create_dashboard_view():
+    # --- Passive Monitoring (samples camera + typing rhythm in the background, see passive_monitor.py) ---
+    monitor = None
+    monitor_button_ref = ft.Ref[ft.IconButton]()
+
+    def on_passive_update(state):
         nonlocal last_mood_result
-        def reset_history(e):
-            nonlocal last_mood_result, baseline_wpm, baseline_error_rate; mood_history.clear(); last_mood_result = None; baseline_wpm = 0.0; baseline_error_rate = 0.0
-            if os.path.exists("consent.txt"): os.remove("consent.txt")
-            page.snack_bar = ft.SnackBar(content=ft.Text("App has been reset to factory settings!"), bgcolor=colors["card_bg"]); page.snack_bar.open = True; page.go("/terms")
-        mood_actions = { "Stressed": {"icon": "local_fire_department", "color": colors["stressed_color"], "actions": ["Dimming screen brightness", "Opening a calming playlist", "Sending helpful notification"]}, "Tired": {"icon": "bedtime", "color": colors["tired_color"], "actions": ["Opening an energizing playlist", "Suggesting a short break", "Increasing screen brightness"]}, "Focused": {"icon": "psychology", "color": colors["focused_color"], "actions": ["Opening your focus playlist", "Silencing non-critical notifications"]}, "Normal": {"icon": "sentiment_satisfied", "color": colors["normal_color"], "actions": ["Everything looks great!", "Keeping your environment stable.", "Have a productive day!"]}, "Calibrated": {"icon": "verified_user", "color": colors["accent"], "actions": ["Your personal baseline has been set.", "Future check-ins will be compared to this.", "You can reset this any time."]} }
-        top_card_content = None
-        if not last_mood_result:
-            top_card_content = create_card(ft.Column([ft.Text("Ready to calibrate?", size=16), ft.Text("Perform your first check-in to set your personal baseline.", size=13, color=colors["text_secondary"]), ft.Divider(height=15, color="transparent"), ft.ElevatedButton(text="Start Calibration", icon="sensors", on_click=lambda _: page.go("/checkin"), bgcolor=colors["accent"], color=colors["background"], height=50)], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=8))
+        mood = state["mood"]
+        # Until the first calibration the dashboard keeps offering it; afterwards the passive mood drives the analysis card
+        if mood is not None and mood != last_mood_result and baseline_wpm > 0:
+            print(f"Passive monitoring: mood changed to {mood}.")
+            last_mood_result = mood
+            if dispatcher is not None: dispatcher.submit(select_actions(mood))
+        refresh_dashboard(top=True)
+
+    def toggle_monitor(e=None):
+        nonlocal monitor
+        if monitor is not None and monitor.running:
+            monitor.stop(); print("Passive monitoring stopped.")
         else:
-            current_mood_data = mood_actions[last_mood_result]; actions_list_view = ft.Column([ft.Row([ft.Icon("check_circle_outline", color=colors["text_secondary"], size=16), ft.Text(action, color=colors["text_secondary"], size=13)]) for action in current_mood_data["actions"]])
-            top_card_content = create_card(ft.Column([ft.Row([ft.Icon(name=current_mood_data["icon"], color=current_mood_data["color"]), ft.Text("Emoboost Bot's Analysis", weight=ft.FontWeight.BOLD)]), ft.Divider(height=10), ft.Text(f"Calibration Complete!" if last_mood_result == "Calibrated" else f"You seem to be feeling: {last_mood_result}", size=18, weight=ft.FontWeight.W_500), ft.Text("Based on this, we're making the following adjustments:", size=12, color=colors["text_secondary"]), ft.Divider(height=10), actions_list_view]))
-        dashboard_app_bar = ft.AppBar(title=ft.Text("Emoboost Dashboard"), bgcolor=colors["background"], actions=[ft.IconButton(icon="published_with_changes", icon_color=colors["accent"], tooltip="Start a new check-in", on_click=lambda _: page.go("/checkin"))])
-        chart_content = None
-        if not mood_history:
+            if monitor is None: monitor = PassiveMonitor(camera, on_update=on_passive_update, history=history, detector_settings=FACE_DETECTOR_SETTINGS, **PASSIVE_MONITOR_SETTINGS)
+            monitor.start(); print("Passive monitoring started.")
+        if monitor_button_ref.current:
+            monitor_button_ref.current.icon_color = colors["accent"] if monitor.running else colors["text_secondary"]
+            monitor_button_ref.current.tooltip = f"Passive monitoring: {'on' if monitor.running else 'off'}"
+        refresh_dashboard(top=True)
+
+    def monitor_status_text():
+        if monitor is None or not monitor.running: return None
+        next_sample = monitor.state["next_sample"]
+        status = f"Passive monitoring on - {monitor.stats['samples']} samples, CPU {monitor.cpu_share:.2%}"
+        if next_sample: status += f", next in {next_sample / 60:.0f} min"
+        return ft.Text(status, size=11, color=colors["text_secondary"])
+
+    # --- Dashboard View (built once; each card is rebuilt only when its data changes) ---
+    mood_actions = { "Stressed": {"icon": "local_fire_department", "color": colors["stressed_color"], "actions": ["Dimming screen brightness", "Opening a calming playlist", "Sending helpful notification"]}, "Tired": {"icon": "bedtime", "color": colors["tired_color"], "actions": ["Opening an energizing playlist", "Suggesting a short break", "Increasing screen brightness"]}, "Focused": {"icon": "psychology", "color": colors["focused_color"], "actions": ["Opening your focus playlist", "Silencing non-critical notifications"]}, "Normal": {"icon": "sentiment_satisfied", "color": colors["normal_color"], "actions": ["Everything looks great!", "Keeping your environment stable.", "Have a productive day!"]}, "Calibrated": {"icon": "verified_user", "color": colors["accent"], "actions": ["Your personal baseline has been set.", "Future check-ins will be compared to this.", "You can reset this any time."]} }
+    mood_colors = {"Normal": colors["normal_color"], "Focused": colors["focused_color"], "Stressed": colors["stressed_color"], "Tired": colors["tired_color"]}
+    dashboard = {"view": None, "top_card": None, "history_card": None, "chart_key": None}
+
+    def reset_history(e):
+        nonlocal last_mood_result, baseline_wpm, baseline_error_rate; mood_series.clear(); history.reset(); last_mood_result = None; baseline_wpm = 0.0; baseline_error_rate = 0.0
+        user.revoke_consent()
+        refresh_dashboard(top=True, chart=True)
+        page.snack_bar = ft.SnackBar(content=ft.Text("App has been reset to factory settings!"), bgcolor=colors["card_bg"]); page.snack_bar.open = True; page.go("/terms")
+
+    def build_top_card_content():
+        if not last_mood_result:
+            return ft.Column([ft.Text("Ready to calibrate?", size=16), ft.Text("Perform your first check-in to set your personal baseline.", size=13, color=colors["text_secondary"]), ft.Divider(height=15, color="transparent"), ft.ElevatedButton(text="Start Calibration", icon="sensors", on_click=lambda _: page.go("/checkin"), bgcolor=colors["accent"], color=colors["background"], height=50)], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=8)
+        current_mood_data = mood_actions[last_mood_result]; actions_list_view = ft.Column([ft.Row([ft.Icon("check_circle_outline", color=colors["text_secondary"], size=16), ft.Text(action, color=colors["text_secondary"], size=13)]) for action in current_mood_data["actions"]])
+        monitor_status = monitor_status_text()
+        return ft.Column([ft.Row([ft.Icon(name=current_mood_data["icon"], color=current_mood_data["color"]), ft.Text("Emoboost Bot's Analysis", weight=ft.FontWeight.BOLD)]), ft.Divider(height=10), ft.Text(f"Calibration Complete!" if last_mood_result == "Calibrated" else f"You seem to be feeling: {last_mood_result}", size=18, weight=ft.FontWeight.W_500), ft.Text("Based on this, we're making the following adjustments:", size=12, color=colors["text_secondary"]), ft.Divider(height=10), actions_list_view] + ([ft.Divider(height=10), monitor_status] if monitor_status else []))
+
+    def build_history_card_content():
+        window_start = start_of_day().timestamp()
+        if not mood_series:
             chart_content = ft.Column([ft.Icon(name="bar_chart_4_bars_rounded", size=40, color=colors["text_secondary"]), ft.Text("No mood history yet.", color=colors["text_secondary"]), ft.Text("Complete a check-in to see your chart.", size=12, color=colors["text_secondary"]),], spacing=10, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
         else:
-            sorted_history = sorted(mood_history, key=lambda x: x['timestamp']); focused_points, stressed_points, tired_points, normal_points, bottom_axis_labels = [], [], [], [], [];
-            def add_point_to_series(entry, point):
-                if entry['mood'] == 'Focused': focused_points.append(point)
-                elif entry['mood'] == 'Stressed': stressed_points.append(point)
-                elif entry['mood'] == 'Tired': tired_points.append(point)
-                elif entry['mood'] == 'Normal': normal_points.append(point)
-            for i, entry in enumerate(sorted_history):
-                real_point = ft.LineChartDataPoint(entry['timestamp'].timestamp(), entry['value']); add_point_to_series(entry, real_point); bottom_axis_labels.append(ft.ChartAxisLabel(value=entry['timestamp'].timestamp(), label=ft.Text(entry['timestamp'].strftime('%H:%M'), size=10, color=colors["text_secondary"])))
-                if i < len(sorted_history) - 1: next_entry = sorted_history[i+1]; bridging_point = ft.LineChartDataPoint(next_entry['timestamp'].timestamp(), entry['value']); add_point_to_series(entry, bridging_point)
-            if sorted_history: last_entry = sorted_history[-1]; final_bridging_point = ft.LineChartDataPoint(datetime.now().timestamp(), last_entry['value']); add_point_to_series(last_entry, final_bridging_point)
+            # Series come pre-bridged and downsampled from MoodSeries; axis labels are thinned to fit the card width
+            series = mood_series.series(window_start, datetime.now().timestamp(), CHART_POINT_BUDGET)
+            max_labels = max(2, int(((page.width or page.window_width) - 70) / CHART_LABEL_WIDTH))
+            bottom_axis_labels = [ft.ChartAxisLabel(value=ts.timestamp(), label=ft.Text(ts.strftime('%H:%M'), size=10, color=colors["text_secondary"])) for ts in mood_series.axis_labels(window_start, max_labels)]
             def create_legend_item(color, name): return ft.Row([ft.Container(width=12, height=12, bgcolor=color, border_radius=6), ft.Text(name, size=12, color=colors["text_secondary"])], spacing=8)
-            legend = ft.Row([create_legend_item(colors["normal_color"], "Normal"), create_legend_item(colors["focused_color"], "Focused"), create_legend_item(colors["stressed_color"], "Stressed"), create_legend_item(colors["tired_color"], "Tired")], alignment=ft.MainAxisAlignment.SPACE_EVENLY)
-            chart = ft.LineChart(data_series=[ft.LineChartData(data_points=normal_points, stroke_width=3, color=colors["normal_color"]), ft.LineChartData(data_points=focused_points, stroke_width=3, color=colors["focused_color"]), ft.LineChartData(data_points=stressed_points, stroke_width=3, color=colors["stressed_color"]), ft.LineChartData(data_points=tired_points, stroke_width=3, color=colors["tired_color"]),], left_axis=ft.ChartAxis(labels_interval=2, title_size=0, labels_size=12), bottom_axis=ft.ChartAxis(labels=bottom_axis_labels, labels_size=12), min_y=0, max_y=10, border=ft.border.all(1, colors["text_secondary"]), expand=True, horizontal_grid_lines=ft.ChartGridLines(interval=2, color=f"{colors['text_secondary']}33"), tooltip_bgcolor="#1F2937CC")
+            legend = ft.Row([create_legend_item(mood_colors[mood], mood) for mood in mood_colors], alignment=ft.MainAxisAlignment.SPACE_EVENLY)
+            chart = ft.LineChart(data_series=[ft.LineChartData(data_points=[ft.LineChartDataPoint(x, y) for x, y in series.get(mood, [])], stroke_width=3, color=color) for mood, color in mood_colors.items()], left_axis=ft.ChartAxis(labels_interval=2, title_size=0, labels_size=12), bottom_axis=ft.ChartAxis(labels=bottom_axis_labels, labels_size=12), min_y=0, max_y=10, border=ft.border.all(1, colors["text_secondary"]), expand=True, horizontal_grid_lines=ft.ChartGridLines(interval=2, color=f"{colors['text_secondary']}33"), tooltip_bgcolor="#1F2937CC")
             chart_content = ft.Column([chart, ft.Divider(height=5, color="transparent"), legend], expand=True, spacing=5, horizontal_alignment=ft.CrossAxisAlignment.CENTER)
         history_card_title = ft.Row([ft.Text(f"MOOD HISTORY ({datetime.now().strftime('%b %d')})", size=11, weight=ft.FontWeight.BOLD, color=colors["text_secondary"]), ft.Container(expand=True), ft.IconButton(icon="delete_sweep_outlined", on_click=reset_history, tooltip="Clear History", icon_size=16, icon_color=colors["text_secondary"])])
-        history_card = create_card(ft.Column([history_card_title, ft.Divider(height=5, color="transparent"), chart_content], expand=True, spacing=5, horizontal_alignment=ft.CrossAxisAlignment.CENTER,))
-        return ft.View("/", [dashboard_app_bar, ft.Column([top_card_content, history_card], spacing=15, scroll=ft.ScrollMode.ADAPTIVE, expand=True)])
+        return ft.Column([history_card_title, ft.Divider(height=5, color="transparent"), chart_content], expand=True, spacing=5, horizontal_alignment=ft.CrossAxisAlignment.CENTER,)
+
+    def chart_key():
+        # The chart changes when a check-in arrives, and its "now" bridge / date title go stale each minute
+        return (mood_series.version, datetime.now().strftime('%Y-%m-%d %H:%M'))
+
+    def refresh_dashboard(top=False, chart=False):
+        if dashboard["view"] is None: return
+        changed = []
+        if top: dashboard["top_card"].content = build_top_card_content(); changed.append(dashboard["top_card"])
+        if chart or dashboard["chart_key"] != chart_key():
+            dashboard["history_card"].content = build_history_card_content(); dashboard["chart_key"] = chart_key(); changed.append(dashboard["history_card"])
+        for card in changed:
+            if card.page: card.update()
+
+    def create_dashboard_view():
+        if dashboard["view"] is None:
+            dashboard["top_card"] = create_card(build_top_card_content())
+            dashboard["history_card"] = create_card(build_history_card_content()); dashboard["chart_key"] = chart_key()
+            dashboard_app_bar = ft.AppBar(title=ft.Text("Emoboost Dashboard"), bgcolor=colors["background"], actions=([] if server_mode else [ft.IconButton(icon="monitor_heart", ref=monitor_button_ref, icon_color=colors["accent"] if monitor is not None and monitor.running else colors["text_secondary"], tooltip=f"Passive monitoring: {'on' if monitor is not None and monitor.running else 'off'}", on_click=toggle_monitor)]) + [ft.IconButton(icon="published_with_changes", icon_color=colors["accent"], tooltip="Start a new check-in", on_click=lambda _: page.go("/checkin"))])
+            dashboard["view"] = ft.View("/", [dashboard_app_bar, ft.Column([dashboard["top_card"], dashboard["history_card"]], spacing=15, scroll=ft.ScrollMode.ADAPTIVE, expand=True)])
+        else:
+            refresh_dashboard()  # Only rebuilds the chart card if it went stale
+        return dashboard["view"]
 
     # --- NEW: Terms and Conditions View ---
     def create_terms_view():
@@ -288,29 +476,99 @@ def main(page: ft.Page):
             continue_button_ref.current.disabled = not e.control.value; page.update()
         def on_continue(e):
             try:
-                with open("consent.txt", "w") as f: f.write("accepted")
+                user.give_consent()
                 page.go("/")
             except Exception as ex: print(f"Error creating consent file: {ex}")
-        terms_text = "Welcome to Emoboost.\n\n1. Privacy and Data:\nThis app performs a typing test to simulate mood analysis. This data is processed locally on your device and is not sent to any server. App history is also stored locally.\n\n2. Disclaimer:\nEmoboost is a proof-of-concept project for a hackathon. It is not a medical device and should not be used for diagnosing or treating any health conditions.\n\n3. Consent:\nBy checking this box and clicking 'Continue', you acknowledge that you have read and understood these terms."
+        privacy_text = "This app performs a typing test and analyses an uploaded snapshot to simulate mood analysis. This data is processed on the Emoboost server you are connected to; snapshots are deleted after analysis and your history is kept there under an anonymous id stored in this browser." if server_mode else "This app performs a typing test to simulate mood analysis. This data is processed locally on your device and is not sent to any server. App history is also stored locally."
+        terms_text = f"Welcome to Emoboost.\n\n1. Privacy and Data:\n{privacy_text}\n\n2. Disclaimer:\nEmoboost is a proof-of-concept project for a hackathon. It is not a medical device and should not be used for diagnosing or treating any health conditions.\n\n3. Consent:\nBy checking this box and clicking 'Continue', you acknowledge that you have read and understood these terms."
         return ft.View("/terms", [ft.AppBar(title=ft.Text("Terms and Conditions"), bgcolor=colors["background"]), ft.Column([create_card(ft.Column([ft.Text(terms_text, color=colors["text_secondary"]), ft.Checkbox(label="I have read and agree to the Terms and Conditions.", on_change=on_checkbox_change), ft.ElevatedButton("Continue", ref=continue_button_ref, disabled=True, on_click=on_continue, bgcolor=colors["accent"], color=colors["background"], expand=True)], spacing=20))], spacing=15, scroll=ft.ScrollMode.ADAPTIVE, expand=True)])
 
+    # --- Hidden Diagnostics View (Ctrl+Shift+D) ---
+    def create_diagnostics_view():
+        metrics_text_ref = ft.Ref[ft.Text]()
+        def render_metrics():
+            snap = metrics.snapshot()
+            lines = [f"Instrumentation: {'on' if snap['enabled'] else 'off'}", ""]
+            lines += [f"{name}: {value}" for name, value in snap["counters"].items()]
+            lines += [f"{name}: n={h['count']} p50={h['p50'] * 1000:.1f}ms p99={h['p99'] * 1000:.1f}ms max={(h['max'] or 0) * 1000:.1f}ms" for name, h in snap["histograms"].items()]
+            return "\n".join(lines)
+        def refresh(e=None):
+            metrics_text_ref.current.value = render_metrics(); page.update()
+        def toggle(e):
+            metrics.enable(e.control.value); refresh()
+        def dump(path):
+            try: metrics.dump(path); show_snack(f"Metrics written to {os.path.abspath(path)}")
+            except Exception as ex: print(f"Could not write metrics file: {ex}")
+        return ft.View("/diagnostics", [
+            ft.AppBar(title=ft.Text("Diagnostics"), bgcolor=colors["background"], leading=ft.IconButton(icon="arrow_back_ios_new_rounded", tooltip="Go Back", on_click=lambda _: page.go("/"))),
+            ft.Column([create_card(ft.Column([
+                ft.Switch(label="Collect metrics", value=metrics.enabled, on_change=toggle, active_color=colors["accent"]),
+                ft.Text(ref=metrics_text_ref, value=render_metrics(), size=11, font_family="monospace", selectable=True, color=colors["text_secondary"]),
+                ft.Row([ft.TextButton("Refresh", on_click=refresh), ft.TextButton("Dump JSON", on_click=lambda _: dump(METRICS_JSON_PATH)), ft.TextButton("Dump Prometheus", on_click=lambda _: dump(METRICS_PROMETHEUS_PATH))], wrap=True),
+            ], spacing=10))], spacing=15, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
+        ])
+
     # --- Navigation Logic ---
     def route_change(route):
+        if page.route != "/checkin": cancel_checkin()
         page.views.clear()
         if page.route == "/terms": page.views.append(create_terms_view())
         elif page.route == "/checkin": page.views.append(create_dashboard_view()); page.views.append(create_checkin_view())
+        elif page.route == "/diagnostics" and not server_mode: page.views.append(create_diagnostics_view())
         else: page.views.append(create_dashboard_view())
-        page.update()
+        with metrics.timer("page_update_seconds", source="navigation"): page.update()
     def view_pop(view):
         page.views.pop(); top_view = page.views[-1]; page.go(top_view.route)
     page.on_route_change = route_change
     page.on_view_pop = view_pop
-    
+    # Diagnostics toggle and dump process-wide metrics, so browser users of a server never get them
+    if not server_mode:
+        page.on_keyboard_event = lambda e: page.go("/diagnostics") if e.ctrl and e.shift and e.key == "D" else None
+
+    def on_session_end(e):
+        cancel_checkin(); stop_webcam(); discard_snapshot()
+        if monitor is not None: monitor.stop()
+        release_user_state(user)
+    page.on_close = on_session_end  # Session expired (tab closed) or desktop window closed
+
     # --- NEW: Startup Logic ---
-    if not os.path.exists("consent.txt"):
+    if not user.has_consent:
         page.go("/terms")
     else:
         page.go("/")
+        if monitor_on_start and not server_mode: toggle_monitor()
+
+def run():
+    global server_mode, detection_pool, dispatcher, monitor_on_start, checkin_executors
+    parser = argparse.ArgumentParser(description="Emoboost: mood-based productivity enhancer")
+    parser.add_argument("--server", action="store_true", help="Serve the app to browsers (one state per user, shared detection pool)")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Port for --server")
+    parser.add_argument("--detect-workers", type=int, default=None, help="Face-detection worker processes for --server (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None, help="Snapshots queued before check-ins are told the server is busy (default: 4 per worker)")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="Concurrent check-ins for --server")
+    parser.add_argument("--monitor", action="store_true", help="Start passive mood monitoring with the app (desktop only)")
+    parser.add_argument("--monitor-cpu-budget", type=float, default=PASSIVE_MONITOR_SETTINGS["cpu_budget"], help="Average CPU share for passive monitoring, e.g. 0.02 = 2%% of one core")
+    args = parser.parse_args()
+    if not args.server:
+        monitor_on_start = args.monitor; PASSIVE_MONITOR_SETTINGS["cpu_budget"] = args.monitor_cpu_budget
+        dispatcher = ActionDispatcher(playlists=mood_playlists, timeout=ACTION_TIMEOUT)
+        ft.app(target=main)
+        return
+    server_mode = True
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.environ.setdefault("FLET_SECRET_KEY", secrets.token_hex(16))  # Required by Flet for signed upload URLs
+    detection_pool = DetectionPool(args.detect_workers, args.max_pending, FACE_DETECTOR_SETTINGS)
+    checkin_executors = make_checkin_executors(args.max_sessions)
+    # Start the worker processes now, before Flet's threads exist, instead of inside the first check-ins' stage timeout
+    try: detection_pool.warm_up()
+    except Exception as e: print(f"Could not warm up detection workers. Error: {e}")
+    print(f"Serving Emoboost on http://localhost:{args.port} with {detection_pool.workers} detection workers (max {detection_pool.max_pending} pending).")
+    try:
+        ft.app(target=main, view=ft.AppView.WEB_BROWSER, port=args.port, upload_dir=UPLOAD_DIR)
+    finally:
+        detection_pool.shutdown()
 
-ft.app(target=main)
+# Guarded so the detection pool's worker processes can import this file without starting the app
+if __name__ == "__main__":
+    run()
 
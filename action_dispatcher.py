@@ -0,0 +1,238 @@
+import os
+import queue
+import threading
+import time
+import metrics
+
+# PowerShell snippet that turns off toast notifications (Windows Focus Assist / DND)
+DND_POWERSHELL = "[Windows.UI.Notifications.Management.UserNotificationListener, Windows.Foundation.UniversalApiContract, ContentType=WindowsRuntime];$listener = [Windows.UI.Notifications.Management.UserNotificationListener]::Current;$listener.RequestAccessAsync() | Out-Null;[Windows.UI.Notifications.Management.UserNotificationListenerAccessStatus]::Allowed;New-ItemProperty -Path HKCU:\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Notifications\\Settings -Name NOC_GLOBAL_SETTING_TOASTS_ENABLED -Value 0 -PropertyType DWord -Force | Out-Null"
+
+
+# --- Backends ---
+class SystemBackend:
+    """The real environment: screen-brightness-control, plyer notifications, the web browser and Windows Focus Assist."""
+    def get_brightness(self):
+        import screen_brightness_control as sbc
+        levels = sbc.get_brightness()
+        return levels[0] if isinstance(levels, list) else levels
+
+    def set_brightness(self, level):
+        import screen_brightness_control as sbc
+        sbc.set_brightness(level)
+
+    def open_url(self, url):
+        import webbrowser
+        webbrowser.open(url)
+
+    def notify(self, title, message):
+        from plyer import notification
+        notification.notify(title=title, message=message, app_name="Emoboost", timeout=10)
+
+    def enable_dnd(self, timeout=None):
+        import subprocess
+        subprocess.run(["powershell", "-Command", DND_POWERSHELL], shell=True, timeout=timeout, check=True)
+
+
+class FakeBackend:
+    """
+    Stand-in backend for Linux/CI: records every call in `calls` instead of touching the system.
+    `delay` simulates slow backends (e.g. to exercise timeouts).
+    """
+    def __init__(self, brightness=50, delay=0.0):
+        self.brightness = brightness
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _call(self, *call):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.calls.append(call)
+
+    def get_brightness(self):
+        return self.brightness
+
+    def set_brightness(self, level):
+        self._call("brightness", level)
+        self.brightness = level
+
+    def open_url(self, url):
+        self._call("open_url", url)
+
+    def notify(self, title, message):
+        self._call("notify", title, message)
+
+    def enable_dnd(self, timeout=None):
+        self._call("dnd")
+
+def default_backend():
+    """SystemBackend, unless EMOBOOST_BACKEND=fake is set (useful on machines without the hardware)."""
+    return FakeBackend() if os.environ.get("EMOBOOST_BACKEND") == "fake" else SystemBackend()
+
+
+# --- Dispatcher ---
+class ActionDispatcher:
+    """
+    Applies environment actions (see mood_engine.select_actions) on a background worker.
+    - submit() only enqueues, so callers never block on the backends.
+    - Batches arriving within `debounce` seconds of each other are coalesced: the latest batch replaces the
+      earlier ones whole, so one mood's brightness is never mixed with another mood's playlist. A steady stream
+      of submissions is applied at most `max_wait` seconds after the first of them.
+    - Actions that are already in effect are dropped: the brightness the screen reports right now, DND turned
+      on less than `dnd_ttl` seconds ago, the same playlist opened less than `playlist_ttl` seconds ago, the
+      same notification within `notify_cooldown`. These expire because the user can change them by hand.
+    - Every backend call runs with a `timeout`; brightness changes ramp in `ramp_steps` steps.
+    """
+    def __init__(self, backend=None, playlists=None, debounce=0.5, max_wait=2.0, timeout=5.0, ramp_steps=5, ramp_interval=0.04,
+                 playlist_ttl=1800.0, dnd_ttl=1800.0, notify_cooldown=60.0):
+        self.backend = backend or default_backend()
+        self.playlists = playlists or {}
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.ramp_steps = ramp_steps
+        self.ramp_interval = ramp_interval
+        self.playlist_ttl = playlist_ttl
+        self.dnd_ttl = dnd_ttl
+        self.notify_cooldown = notify_cooldown
+        # What we believe is currently in effect (brightness is re-read from the backend before every change)
+        self.brightness = None
+        self._dnd_enabled = None  # Time DND was last turned on
+        self._opened = {}  # playlist url -> time opened
+        self._notified = {}  # (title, message) -> time sent
+        self.stats = {"submitted": 0, "applied": 0, "skipped": 0, "failed": 0, "timed_out": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._outstanding = 0  # Batches submitted but not yet applied
+        self._idle = threading.Event(); self._idle.set()
+        self._worker = threading.Thread(target=self._run, name="emoboost-actions", daemon=True)
+        self._worker.start()
+
+    def submit(self, actions):
+        """Queues a list of (action, argument) pairs and returns immediately."""
+        actions = list(actions)
+        if not actions:
+            return
+        with self._lock:
+            self._outstanding += 1
+            self._idle.clear()
+            self.stats["submitted"] += len(actions)
+        self._queue.put(actions)
+
+    def wait_idle(self, timeout=None):
+        """Blocks until everything submitted so far has been applied (mainly for tests and shutdown)."""
+        return self._idle.wait(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join(timeout=2)
+
+    # --- Worker ---
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            # Debounce: keep absorbing bursts until the queue has been quiet for `debounce` seconds (or `max_wait` has passed)
+            deadline = time.monotonic() + self.max_wait
+            pending = {}
+            stop = False
+            absorbed = 0
+            while batch is not None:
+                absorbed += 1
+                pending = dict(batch)  # The latest batch wins as a whole
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch = self._queue.get(timeout=min(self.debounce, remaining))
+                    if batch is None: stop = True
+                except queue.Empty:
+                    batch = None
+            for action, arg in pending.items():
+                try: self._apply(action, arg)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    metrics.inc("action_failures_total", action=action)
+                    print(f"Could not apply '{action}'. Error: {e}")
+            with self._lock:
+                self._outstanding -= absorbed
+                if self._outstanding == 0:
+                    self._idle.set()
+            if stop:
+                return
+
+    def _call(self, fn, *args):
+        """
+        Runs one backend call on its own daemon thread and waits up to `timeout` for it. A call that hangs
+        (webbrowser, sbc and plyer can) is abandoned: it cannot hold up later actions or interpreter exit.
+        """
+        name = getattr(fn, '__name__', 'backend_call')
+        done, result = threading.Event(), {}
+        def target():
+            try: result["value"] = fn(*args)
+            except BaseException as e: result["error"] = e
+            finally: done.set()
+        threading.Thread(target=target, name=f"emoboost-action-{name}", daemon=True).start()
+        with metrics.timer("action_seconds", backend=name):
+            finished = done.wait(self.timeout)
+        if not finished:
+            self.stats["timed_out"] += 1
+            metrics.inc("action_timeouts_total", backend=name)
+            raise TimeoutError(f"{name} did not finish within {self.timeout:g}s")
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+    def _skip(self, reason):
+        self.stats["skipped"] += 1
+        print(f"Skipping action: {reason}")
+
+    def _apply(self, action, arg):
+        now = time.monotonic()
+        if action == "brightness":
+            if not self._ramp_brightness(int(arg)):
+                return
+        elif action == "playlist":
+            url = self.playlists.get(arg)
+            if not url:
+                return
+            if now - self._opened.get(url, -self.playlist_ttl) < self.playlist_ttl:
+                return self._skip(f"'{arg}' playlist already open")
+            self._call(self.backend.open_url, url); self._opened[url] = now
+            print(f"Opening '{arg}' playlist in web browser.")
+        elif action == "dnd":
+            if self._dnd_enabled is not None and now - self._dnd_enabled < self.dnd_ttl:
+                return self._skip("DND already enabled")
+            self._call(self.backend.enable_dnd, self.timeout); self._dnd_enabled = now
+            print("DND mode enabled (Windows Focus Assist).")
+        elif action == "notify":
+            if now - self._notified.get(arg, -self.notify_cooldown) < self.notify_cooldown:
+                return self._skip(f"notification '{arg[0]}' sent recently")
+            self._call(self.backend.notify, *arg); self._notified[arg] = now
+            print("OS notification sent.")
+        else:
+            raise ValueError(f"Unknown action '{action}'")
+        self.stats["applied"] += 1
+
+    def _ramp_brightness(self, target):
+        # Re-read every time: the user may have changed it by hand since our last change
+        try: self.brightness = self._call(self.backend.get_brightness)
+        except Exception as e: print(f"Could not read screen brightness. Error: {e}")
+        current = self.brightness
+        if current == target:
+            self._skip(f"brightness already {target}%")
+            return False
+        if current is None:
+            levels = [target]
+        else:
+            steps = max(1, min(self.ramp_steps, abs(target - current)))
+            levels = [round(current + (target - current) * i / steps) for i in range(1, steps + 1)]
+        for level in levels:
+            self._call(self.backend.set_brightness, level)
+            self.brightness = level
+            if level != target:
+                time.sleep(self.ramp_interval)
+        print(f"Brightness set to {target}%")
+        return True
@@ -0,0 +1,82 @@
+"""
+Benchmark for face detection, run against recorded clips instead of a webcam.
+
+    python bench_detection.py clip1.mp4 [clip2.mp4 ...] [--frames 300] [--detect-width 320] [--detect-every 5]
+
+For every frame, the original full-frame detectMultiScale(gray, 1.3, 5) is used as the reference.
+FaceDetector then processes the same frames and is scored against it: detections/sec for both,
+face-present agreement, and mean IoU on frames where both found a face.
+"""
+import argparse
+import time
+
+import cv2
+
+from camera_service import get_face_cascade
+from face_detector import FaceDetector
+
+def load_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open video file: {path}")
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def detect_original(cascade, frame):
+    """The detection step as it was in FINAL PROTOTYPE.py before FaceDetector (largest face kept)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    faces = cascade.detectMultiScale(gray, 1.3, 5)
+    if len(faces) == 0:
+        return None
+    return tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+def bench_clip(path, args, cascade):
+    frames = load_frames(path, args.frames)
+    if not frames:
+        print(f"{path}: no frames, skipped")
+        return
+    started = time.perf_counter()
+    reference = [detect_original(cascade, f) for f in frames]
+    original_s = time.perf_counter() - started
+
+    detector = FaceDetector(cascade=cascade, detect_width=args.detect_width, detect_every=args.detect_every)
+    started = time.perf_counter()
+    boxes = [detector.process(f) for f in frames]
+    detector_s = time.perf_counter() - started
+
+    agree = sum(1 for r, b in zip(reference, boxes) if (r is None) == (b is None))
+    overlaps = [iou(r, b) for r, b in zip(reference, boxes) if r is not None and b is not None]
+    n = len(frames)
+    print(f"{path} ({n} frames, {sum(r is not None for r in reference)} with a face in the reference)")
+    print(f"  original  {n / original_s:8.1f} detections/s")
+    print(f"  detector  {n / detector_s:8.1f} detections/s  ({original_s / detector_s:.1f}x)  stats={detector.stats}")
+    print(f"  agreement {agree / n:8.1%}  mean IoU {sum(overlaps) / len(overlaps) if overlaps else 0.0:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clips", nargs="+", help="Recorded video files to replay")
+    parser.add_argument("--frames", type=int, default=300, help="Maximum number of frames per clip")
+    parser.add_argument("--detect-width", type=int, default=320, help="Width of the downscaled detection frame")
+    parser.add_argument("--detect-every", type=int, default=5, help="Run the cascade every N frames, tracking in between")
+    args = parser.parse_args()
+    cascade = get_face_cascade()
+    for path in args.clips:
+        bench_clip(path, args, cascade)
+
+if __name__ == "__main__":
+    main()
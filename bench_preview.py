@@ -0,0 +1,85 @@
+"""
+Benchmark for the live-preview pipeline, run against a recorded video instead of a webcam.
+
+    python bench_preview.py clip.mp4 [--frames 300] [--update-ms 0]
+
+Compares the original per-frame path (BGR->RGB, resize, PIL JPEG into BytesIO, base64) with
+PreviewEncoder and reports frames/sec and CPU time per frame for each. --update-ms simulates the
+cost of pushing a frame to the Flet UI, which is what drives PreviewEncoder's fps/quality adaptation.
+"""
+import argparse
+import base64
+import time
+from io import BytesIO
+
+import cv2
+from PIL import Image
+
+from preview_encoder import PreviewEncoder
+
+def load_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open video file: {path}")
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"No frames could be read from {path}")
+    return frames
+
+def encode_original(frame):
+    """The preview path as it was in FINAL PROTOTYPE.py before PreviewEncoder."""
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame = cv2.resize(frame, (320, 240))
+    img_pil = Image.fromarray(frame)
+    buf = BytesIO()
+    img_pil.save(buf, format="JPEG")
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+def run_original(frames, update_s):
+    sent = 0
+    for frame in frames:
+        encode_original(frame)
+        if update_s: time.sleep(update_s)
+        sent += 1
+    return {"sent": sent, "skipped": 0}
+
+def run_encoder(frames, update_s):
+    # Pacing sleeps are left out so both paths are measured on pure throughput
+    encoder = PreviewEncoder()
+    for frame in frames:
+        started = time.perf_counter()
+        if encoder.encode(frame, started) is not None:
+            if update_s: time.sleep(update_s)
+            encoder.record_cost(time.perf_counter() - started)
+    return {"sent": encoder.sent, "skipped": encoder.skipped, "fps": encoder.fps, "quality": encoder.quality}
+
+def measure(name, fn, frames, update_s):
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    stats = fn(frames, update_s)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    n = len(frames)
+    extra = "".join(f"  {k}={v:.1f}" if isinstance(v, float) else f"  {k}={v}" for k, v in stats.items())
+    print(f"{name:<10} {n / wall:8.1f} frames/s  {cpu / n * 1000:7.3f} ms CPU/frame{extra}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("video", help="Recorded video file to replay")
+    parser.add_argument("--frames", type=int, default=300, help="Maximum number of frames to replay")
+    parser.add_argument("--update-ms", type=float, default=0.0, help="Simulated UI update cost per sent frame")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    h, w = frames[0].shape[:2]
+    print(f"Replaying {len(frames)} frames ({w}x{h}) from {args.video}")
+    update_s = args.update_ms / 1000.0
+    measure("original", run_original, frames, update_s)
+    measure("encoder", run_encoder, frames, update_s)
+
+if __name__ == "__main__":
+    main()
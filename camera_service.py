@@ -0,0 +1,189 @@
+import threading
+import time
+import cv2  # For webcam capture
+import metrics
+
+# Haar cascade used for face detection (see get_face_cascade)
+FACE_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+_face_cascades = threading.local()
+
+def get_face_cascade():
+    """
+    Returns this thread's frontal-face CascadeClassifier, loading it from disk on first use.
+    A CascadeClassifier is not safe to share between threads (check-in stages and the passive
+    monitor detect concurrently), so each thread gets its own.
+    """
+    cascade = getattr(_face_cascades, "cascade", None)
+    if cascade is None:
+        with metrics.timer("cascade_load_seconds"):
+            cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
+        if cascade.empty():
+            raise RuntimeError(f"Could not load face cascade from {FACE_CASCADE_PATH}")
+        _face_cascades.cascade = cascade
+    return cascade
+
+
+class FrameRing:
+    """
+    Fixed-size ring buffer of the most recent frames.
+    Each slot holds (seq, timestamp, frame). Frames are stored by reference and handed out
+    as-is, so consumers must treat them as read-only.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._slots = [None] * size
+        self._seq = 0  # Sequence number of the newest frame (0 = empty)
+
+    def push(self, frame, timestamp):
+        self._seq += 1
+        self._slots[self._seq % self.size] = (self._seq, timestamp, frame)
+        return self._seq
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def latest(self):
+        return self._slots[self._seq % self.size] if self._seq else None
+
+    def get(self, seq):
+        """Returns the slot for `seq`, or None if it was overwritten or not captured yet."""
+        if seq <= 0 or seq > self._seq or seq <= self._seq - self.size:
+            return None
+        return self._slots[seq % self.size]
+
+    def clear(self):
+        # Sequence numbers keep increasing so consumers waiting on an old seq never stall
+        self._slots = [None] * self.size
+
+
+class CameraService:
+    """
+    Owns the webcam. A single background thread reads frames into a FrameRing, and every
+    consumer (live preview, face detection) reads from that ring instead of opening the device itself.
+    The device is opened by the first acquire() and released after the last release().
+    """
+    def __init__(self, device_index=0, buffer_size=8):
+        self.device_index = device_index
+        self._ring = FrameRing(buffer_size)
+        self._cond = threading.Condition()
+        self._users = 0
+        self._cap = None
+        self._thread = None
+        self._running = False
+        self._error = None
+
+    # --- Lifecycle ---
+    def acquire(self):
+        """Registers a consumer, opening the camera if needed. Raises RuntimeError if no camera is available."""
+        with self._cond:
+            self._users += 1
+            if self._running:
+                return
+            while self._cap is not None:  # Previous capture thread is still shutting down
+                self._cond.wait(1.0)
+                if self._running:
+                    return  # Another consumer reopened the camera while we waited
+            with metrics.timer("camera_open_seconds"):
+                cap = cv2.VideoCapture(self.device_index)
+            if not cap.isOpened():
+                metrics.inc("camera_open_failures_total")
+                cap.release()
+                self._users -= 1
+                raise RuntimeError("No camera detected. Please connect a webcam to use facial mood recognition.")
+            self._cap = cap
+            self._error = None
+            self._ring.clear()
+            self._running = True
+            self._thread = threading.Thread(target=self._capture_loop, name="emoboost-camera", daemon=True)
+            self._thread.start()
+
+    def release(self):
+        """Unregisters a consumer; the device is closed once nobody is using it."""
+        with self._cond:
+            if self._users == 0:
+                return
+            self._users -= 1
+            if self._users == 0:
+                self._running = False
+                self._cond.notify_all()
+
+    def shutdown(self):
+        with self._cond:
+            self._users = 0
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def _capture_loop(self):
+        cap = self._cap
+        failures = 0
+        try:
+            while self._running:
+                ret, frame = cap.read()
+                if not ret:
+                    failures += 1
+                    metrics.inc("camera_read_failures_total")
+                    if failures >= 30:
+                        raise RuntimeError("Camera stopped delivering frames.")
+                    time.sleep(0.01)
+                    continue
+                failures = 0
+                with self._cond:
+                    self._ring.push(frame, time.time())
+                    self._cond.notify_all()
+        except Exception as e:
+            print(f"Camera capture error: {e}")
+            with self._cond:
+                self._error = e
+                self._running = False
+                self._users = 0
+                self._cond.notify_all()
+        finally:
+            cap.release()
+            with self._cond:
+                if self._cap is cap:
+                    self._cap = None
+                self._cond.notify_all()
+
+    # --- Frame access ---
+    def latest(self):
+        """Returns (seq, timestamp, frame) for the newest frame, or None."""
+        with self._cond:
+            return self._ring.latest()
+
+    def wait_frame(self, after_seq=0, timeout=1.0):
+        """
+        Blocks until a frame newer than `after_seq` is available and returns (seq, timestamp, frame).
+        If the consumer fell behind, older frames are skipped and the newest one is returned.
+        Returns None on timeout or when the camera stops.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._ring.seq <= after_seq or self._ring.latest() is None:
+                remaining = deadline - time.monotonic()
+                if not self._running or remaining <= 0:
+                    if self._error is not None:
+                        raise RuntimeError(str(self._error))
+                    return None
+                self._cond.wait(remaining)
+            return self._ring.latest()
+
+    def frames(self, count, timeout=1.0):
+        """Yields up to `count` consecutive new frames (as numpy arrays), stopping early on timeout."""
+        seq = self._ring.seq
+        for _ in range(count):
+            item = self.wait_frame(seq, timeout)
+            if item is None:
+                return
+            seq, _, frame = item
+            yield frame
+
+
+# Process-wide camera, shared by every view that needs the webcam
+camera = CameraService()
@@ -0,0 +1,115 @@
+import bisect
+import math
+
+# Moods drawn on the dashboard chart, in legend order
+CHART_MOODS = ("Normal", "Focused", "Stressed", "Tired")
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of [(x, y), ...] sorted by x.
+    Keeps the first and last point and, from each bucket in between, the point that forms the
+    largest triangle with its neighbours, so spikes and steps survive the reduction.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        # Average of the next bucket is the third corner of the triangle
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, n)
+        next_slice = points[next_start:next_end] or points[-1:]
+        avg_x = sum(p[0] for p in next_slice) / len(next_slice)
+        avg_y = sum(p[1] for p in next_slice) / len(next_slice)
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+class MoodSeries:
+    """
+    Per-mood chart series, maintained incrementally as check-ins arrive.
+    Every check-in contributes its real point plus a "bridging" point at the next check-in's time
+    (so each mood is drawn as a step until the mood changes). The final bridge to "now" is added
+    when the series is read. Downsampled results are cached until the next add()/clear().
+    """
+    def __init__(self, entries=()):
+        self.clear()
+        for entry in sorted(entries, key=lambda e: e['timestamp']):
+            self.add(entry)
+
+    def clear(self):
+        self._entries = []
+        self._xs = {mood: [] for mood in CHART_MOODS}  # Parallel x arrays for bisecting the visible window
+        self._points = {mood: [] for mood in CHART_MOODS}
+        self._cache = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def _append_point(self, mood, x, y):
+        self._xs.setdefault(mood, []).append(x)
+        self._points.setdefault(mood, []).append((x, y))
+
+    def add(self, entry):
+        ts = entry['timestamp'].timestamp()
+        if self._entries and ts < self._entries[-1]['timestamp'].timestamp():
+            # Out-of-order entries are rare (clock changes), so just rebuild
+            entries = self._entries + [entry]
+            self.__init__(entries)
+            return
+        if self._entries:
+            prev = self._entries[-1]
+            self._append_point(prev['mood'], ts, prev['value'])
+        self._entries.append(entry)
+        self._append_point(entry['mood'], ts, entry['value'])
+        self.version += 1
+        self._cache.clear()
+
+    def series(self, start, now, budget=120):
+        """
+        Returns {mood: [(x, y), ...]} for check-ins at or after `start` (a POSIX timestamp),
+        downsampled to roughly `budget` points in total, with the last mood bridged to `now`.
+        """
+        key = (start, budget)
+        cached = self._cache.get(key)
+        if cached is None:
+            visible = {}
+            for mood, points in self._points.items():
+                visible[mood] = points[bisect.bisect_left(self._xs[mood], start):]
+            total = sum(len(p) for p in visible.values()) or 1
+            cached = {mood: lttb(points, max(3, round(budget * len(points) / total))) for mood, points in visible.items()}
+            self._cache[key] = cached
+        result = {mood: list(points) for mood, points in cached.items()}
+        if self._entries:
+            last = self._entries[-1]
+            if last['timestamp'].timestamp() >= start:
+                result.setdefault(last['mood'], []).append((max(now, last['timestamp'].timestamp()), last['value']))
+        return result
+
+    def axis_labels(self, start, max_labels):
+        """Returns the check-in timestamps to label, thinned to at most `max_labels` (always including the latest)."""
+        times = [e['timestamp'] for e in self._entries if e['timestamp'].timestamp() >= start]
+        if len(times) <= max_labels:
+            return times
+        step = math.ceil(len(times) / max(1, max_labels))
+        return times[::-1][::step][::-1]
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Check-in work is kept off the Flet event thread. Pipelines and their stages use separate pools: a pipeline
+# blocks while waiting for its stage, so sharing one bounded pool lets a few pipelines starve their own stages.
+checkin_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="emoboost-checkin")
+checkin_stage_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="emoboost-stage")
+
+def make_checkin_executors(sessions):
+    """Pipeline and stage pools for `sessions` concurrent check-ins (server mode), as keyword arguments for CheckinJob."""
+    return {"executor": ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="emoboost-checkin"),
+            "stage_executor": ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="emoboost-stage")}
+
+class CheckinCancelled(Exception):
+    """Raised inside a check-in pipeline once the user has cancelled it."""
+
+class StageTimeout(Exception):
+    """Raised when a single pipeline stage does not finish within its timeout."""
+
+
+class CheckinJob:
+    """
+    One running check-in. The pipeline function runs on `executor` and executes its stages on
+    `stage_executor` through run_stage(), which reports progress, enforces a per-stage timeout and stops waiting as
+    soon as cancel() is called. Long-running stages should also watch `cancelled` themselves so
+    they stop doing work, not just stop being waited on.
+    """
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, on_progress=None, executor=None, stage_executor=None):
+        self.cancelled = threading.Event()
+        self.on_progress = on_progress
+        self.executor = executor or checkin_executor
+        self.stage_executor = stage_executor or checkin_stage_executor
+        if self.stage_executor is self.executor:
+            raise ValueError("Stages must not run on the pipeline executor (the pipeline would wait on its own pool).")
+        self.future = None
+        self.stage = None
+
+    def start(self, pipeline, *args):
+        """Runs `pipeline(job, *args)` on the worker pool and returns the job."""
+        self.future = self.executor.submit(pipeline, self, *args)
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise CheckinCancelled()
+
+    def report(self, stage):
+        self.stage = stage
+        if self.on_progress:
+            try: self.on_progress(stage)
+            except Exception as e: print(f"Could not show check-in progress. Error: {e}")
+
+    def run_stage(self, stage, fn, *args, timeout=5.0):
+        """Runs one stage on the stage pool and returns its result. Raises CheckinCancelled or StageTimeout."""
+        self.check()
+        self.report(stage)
+        future = self.stage_executor.submit(fn, *args)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                future.cancel()
+                raise StageTimeout(f"'{stage}' did not finish within {timeout:.0f}s")
+            try:
+                return future.result(timeout=min(self.POLL_INTERVAL, remaining))
+            except FutureTimeoutError:
+                if self.cancelled.is_set():
+                    future.cancel()
+                    raise CheckinCancelled()
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+
+class PoolBusy(RuntimeError):
+    """Raised by DetectionPool.submit() when the queue is full, so callers can back off instead of piling up."""
+
+
+def detect_snapshot(image_bytes, detector_settings=None):
+    """
+    Runs in a worker process: decodes an uploaded image (JPEG/PNG bytes) and looks for a face.
+    Returns (face_mood or None, detection seconds).
+    """
+    import cv2
+    import numpy as np
+    import mood_engine
+    frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Could not decode the uploaded snapshot.")
+    started = time.perf_counter()
+    mood = mood_engine.detect_face([frame], detector_settings, max_frames=1)
+    return mood, time.perf_counter() - started
+
+
+class DetectionPool:
+    """
+    One bounded pool of face-detection worker processes shared by every session.
+    At most `max_pending` snapshots are queued or running at once; beyond that submit() raises
+    PoolBusy immediately (backpressure) rather than letting latency grow without limit.
+    """
+    def __init__(self, workers=None, max_pending=None, detector_settings=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.detector_settings = detector_settings
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def submit(self, image_bytes):
+        """Queues a snapshot and returns a Future of (face_mood, detection seconds)."""
+        if not self._slots.acquire(blocking=False):
+            metrics.inc("detection_rejected_total")
+            raise PoolBusy("The server is busy analysing other check-ins. Please try again in a moment.")
+        try:
+            future = self._pool.submit(detect_snapshot, image_bytes, self.detector_settings)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def detect(self, image_bytes, timeout=None):
+        """Blocking helper: returns the facial mood (or None) for one snapshot."""
+        with metrics.timer("detection_pool_seconds"):
+            mood, _ = self.submit(image_bytes).result(timeout=timeout)
+        return mood
+
+    def warm_up(self):
+        """Starts every worker process (and loads the cascade there) before the first real request."""
+        import cv2
+        import numpy as np
+        ok, blank = cv2.imencode(".jpg", np.zeros((240, 320, 3), dtype=np.uint8))
+        for future in [self._pool.submit(detect_snapshot, blank.tobytes(), self.detector_settings) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
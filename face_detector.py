@@ -0,0 +1,140 @@
+import cv2
+import metrics
+from camera_service import get_face_cascade
+
+class FaceDetector:
+    """
+    Cheaper face detection over a stream of frames.
+    - The Haar cascade runs on a grayscale copy downscaled to `detect_width` pixels wide.
+    - Once a face is found, later cascade runs only search a padded region around it.
+    - Between cascade runs (every `detect_every` frames) the face is followed with template matching.
+    - `stable` becomes True after `stable_frames` consecutive frames with a face that barely moved,
+      so callers can stop early.
+    Boxes are returned as (x, y, w, h) in full-frame coordinates.
+    """
+    def __init__(self, cascade=None, scale_factor=1.3, min_neighbors=5, detect_width=320, min_face=24,
+                 roi_padding=0.5, detect_every=5, track_threshold=0.6, stable_frames=3, stable_motion=0.1):
+        self.cascade = cascade or get_face_cascade()
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.detect_width = detect_width
+        self.min_face = min_face  # Minimum face size in downscaled pixels
+        self.roi_padding = roi_padding  # ROI grows by this fraction of the face size on each side
+        self.detect_every = detect_every
+        self.track_threshold = track_threshold  # Minimum normalized correlation to trust the tracker
+        self.stable_frames = stable_frames
+        self.stable_motion = stable_motion  # Max center shift (fraction of face width) still counted as stable
+        self.stats = {"frames": 0, "cascade_runs": 0, "roi_runs": 0, "tracked": 0, "faces": 0}
+        self.reset()
+
+    def reset(self):
+        self._box = None  # Last face box in downscaled coordinates
+        self._template = None
+        self._since_detect = 0
+        self._scale = None
+        self._gray = None
+        self._small = None
+        self.stable_count = 0
+
+    @property
+    def stable(self):
+        return self.stable_count >= self.stable_frames
+
+    # --- Per-frame processing ---
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        if self._scale is None:
+            self._scale = min(1.0, self.detect_width / float(w))
+        self._gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray if self._gray is not None and self._gray.shape == (h, w) else None)
+        size = (max(1, int(w * self._scale)), max(1, int(h * self._scale)))
+        if self._scale < 1.0:
+            self._small = cv2.resize(self._gray, size, dst=self._small if self._small is not None and self._small.shape == size[::-1] else None, interpolation=cv2.INTER_AREA)
+        else:
+            self._small = self._gray
+        return self._small
+
+    def _padded(self, box, shape):
+        x, y, w, h = box
+        pad_w, pad_h = int(w * self.roi_padding), int(h * self.roi_padding)
+        x0, y0 = max(0, x - pad_w), max(0, y - pad_h)
+        x1, y1 = min(shape[1], x + w + pad_w), min(shape[0], y + h + pad_h)
+        return x0, y0, x1, y1
+
+    def _cascade(self, image, offset=(0, 0), region="full"):
+        with metrics.timer("face_detect_seconds", region=region):
+            faces = self.cascade.detectMultiScale(image, self.scale_factor, self.min_neighbors, minSize=(self.min_face, self.min_face))
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])  # Largest face is the user
+        return (int(x) + offset[0], int(y) + offset[1], int(w), int(h))
+
+    def _detect(self, small):
+        self._since_detect = 0
+        if self._box is not None:
+            x0, y0, x1, y1 = self._padded(self._box, small.shape)
+            self.stats["roi_runs"] += 1
+            box = self._cascade(small[y0:y1, x0:x1], (x0, y0), "roi")
+            if box is not None:
+                return box
+        self.stats["cascade_runs"] += 1
+        return self._cascade(small)
+
+    def _track(self, small):
+        x0, y0, x1, y1 = self._padded(self._box, small.shape)
+        th, tw = self._template.shape
+        if x1 - x0 < tw or y1 - y0 < th:
+            return None
+        result = cv2.matchTemplate(small[y0:y1, x0:x1], self._template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv2.minMaxLoc(result)
+        if score < self.track_threshold:
+            return None
+        self.stats["tracked"] += 1
+        return (x0 + mx, y0 + my, tw, th)
+
+    def process(self, frame):
+        """Processes one BGR frame and returns the face box in full-frame coordinates, or None."""
+        self.stats["frames"] += 1
+        small = self._prepare(frame)
+        box = None
+        self._since_detect += 1
+        if self._box is not None and self._since_detect < self.detect_every:
+            box = self._track(small)
+        if box is None:
+            box = self._detect(small)
+        self._update_stability(box)
+        self._box = box
+        if box is None:
+            self._template = None
+            return None
+        self.stats["faces"] += 1
+        x, y, w, h = box
+        self._template = small[y:y + h, x:x + w].copy()
+        inv = 1.0 / self._scale
+        return (int(x * inv), int(y * inv), int(w * inv), int(h * inv))
+
+    def _update_stability(self, box):
+        if box is None:
+            self.stable_count = 0
+        elif self._box is None:
+            self.stable_count = 1
+        else:
+            (px, py, pw, ph), (x, y, w, h) = self._box, box
+            shift = abs((x + w / 2) - (px + pw / 2)) + abs((y + h / 2) - (py + ph / 2))
+            self.stable_count = self.stable_count + 1 if shift <= self.stable_motion * max(pw, 1) else 1
+
+    def run(self, frames, max_frames=30, should_stop=None):
+        """
+        Runs over up to `max_frames` frames, stopping as soon as the face is stable.
+        Returns (face_found, last_box, frames_used); a run abandoned because `should_stop()` became true finds nothing.
+        """
+        box, found, used = None, False, 0
+        for frame in frames:
+            if should_stop is not None and should_stop():
+                return False, None, used
+            used += 1
+            current = self.process(frame)
+            if current is not None:
+                box, found = current, True
+            if self.stable or used >= max_frames:
+                break
+        return found, box, used
@@ -0,0 +1,158 @@
+import atexit
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# Local embedded store for check-ins, calibration baselines and raw metrics (SQLite, stdlib only)
+DB_PATH = "emoboost.db"
+MAX_PENDING = 10000  # Unsaved rows kept for a later retry while the database cannot be written
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkins (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, mood TEXT NOT NULL, value INTEGER NOT NULL,
+    wpm REAL, error_rate REAL, face_mood TEXT
+);
+CREATE INDEX IF NOT EXISTS checkins_ts ON checkins (ts);
+CREATE TABLE IF NOT EXISTS baselines (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, wpm REAL NOT NULL, error_rate REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL, value REAL
+);
+CREATE INDEX IF NOT EXISTS metrics_ts ON metrics (ts);
+"""
+
+def start_of_day(day=None):
+    day = day or datetime.now()
+    return day.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class HistoryStore:
+    """
+    Append-only history of check-ins, baselines and metrics.
+    Writes are buffered in memory and flushed in one transaction when the batch fills up, every
+    `flush_interval` seconds, before any read, and at exit. Rows are never updated in place: the
+    newest baseline row is the current baseline, and reset() empties every table at once.
+    """
+    def __init__(self, path=DB_PATH, batch_size=32, flush_interval=2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._pending = []  # (sql, params) waiting for the next flush
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="emoboost-history", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # --- Writes ---
+    def _append(self, sql, params):
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def add_checkin(self, timestamp, mood, value, wpm=None, error_rate=None, face_mood=None):
+        self._append("INSERT INTO checkins (ts, mood, value, wpm, error_rate, face_mood) VALUES (?, ?, ?, ?, ?, ?)",
+                     (timestamp.timestamp(), mood, value, wpm, error_rate, face_mood))
+
+    def set_baseline(self, wpm, error_rate, timestamp=None):
+        self._append("INSERT INTO baselines (ts, wpm, error_rate) VALUES (?, ?, ?)",
+                     ((timestamp or datetime.now()).timestamp(), wpm, error_rate))
+
+    def add_metrics(self, kind, values, timestamp=None):
+        """Records raw metrics, e.g. add_metrics("typing", {"wpm": 52.0, "error_rate": 3.1})."""
+        ts = (timestamp or datetime.now()).timestamp()
+        for name, value in values.items():
+            self._append("INSERT INTO metrics (ts, kind, name, value) VALUES (?, ?, ?, ?)", (ts, kind, name, value))
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            for attempt in range(2):  # One immediate retry covers a transiently locked database
+                try:
+                    with self._conn:
+                        for sql, params in batch:
+                            try: self._conn.execute(sql, params)
+                            except sqlite3.OperationalError: raise
+                            except sqlite3.Error as e:
+                                # This row can never be written (bad value, constraint): drop it, keep the rest
+                                print(f"Could not save history row {params!r}, dropping it. Error: {e}")
+                    return
+                except sqlite3.OperationalError as e:
+                    error = e
+            # Database locked or busy: keep the rows (earlier failures included) for the next flush
+            dropped = max(0, len(batch) - MAX_PENDING)
+            self._pending = batch[dropped:]
+            print(f"Could not save history, will retry. Error: {error}" + (f" ({dropped} oldest rows dropped)" if dropped else ""))
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def reset(self):
+        """Deletes all history, baselines and metrics in a single transaction."""
+        with self._lock:
+            self._pending = []
+            with self._conn:
+                # Unfiltered DELETEs use SQLite's truncate optimization instead of visiting rows
+                for table in ("checkins", "baselines", "metrics"):
+                    self._conn.execute(f"DELETE FROM {table}")
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        atexit.unregister(self.close)  # Server mode opens and closes one store per user; don't keep them all alive
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    # --- Reads (all flush pending writes first) ---
+    def _query(self, sql, params=()):
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    def latest_baseline(self):
+        """Returns (wpm, error_rate) of the current baseline, or None if not calibrated."""
+        rows = self._query("SELECT wpm, error_rate FROM baselines ORDER BY id DESC LIMIT 1")
+        return rows[0] if rows else None
+
+    def last_checkin(self):
+        rows = self._query("SELECT ts, mood, value FROM checkins ORDER BY ts DESC LIMIT 1")
+        return self._to_entry(rows[0]) if rows else None
+
+    def checkins_between(self, start, end=None):
+        """Check-ins with start <= timestamp < end (end defaults to now), oldest first. Uses the ts index."""
+        end_ts = (end or datetime.now() + timedelta(seconds=1)).timestamp()
+        rows = self._query("SELECT ts, mood, value FROM checkins WHERE ts >= ? AND ts < ? ORDER BY ts",
+                           (start.timestamp(), end_ts))
+        return [self._to_entry(row) for row in rows]
+
+    def today(self):
+        return self.checkins_between(start_of_day())
+
+    def last_days(self, days):
+        return self.checkins_between(start_of_day() - timedelta(days=days - 1))
+
+    def per_hour(self, start, end=None):
+        """Returns {(hour_start datetime, mood): count} for check-ins in [start, end)."""
+        end_ts = (end or datetime.now() + timedelta(seconds=1)).timestamp()
+        # Bucketing on local wall-clock hours so "per hour" matches the times shown in the dashboard
+        rows = self._query(
+            "SELECT strftime('%Y-%m-%d %H:00:00', ts, 'unixepoch', 'localtime') AS hour, mood, COUNT(*) "
+            "FROM checkins WHERE ts >= ? AND ts < ? GROUP BY hour, mood ORDER BY hour",
+            (start.timestamp(), end_ts))
+        return {(datetime.strptime(hour, "%Y-%m-%d %H:%M:%S"), mood): count for hour, mood, count in rows}
+
+    @staticmethod
+    def _to_entry(row):
+        ts, mood, value = row
+        return {'timestamp': datetime.fromtimestamp(ts), 'mood': mood, 'value': value}
@@ -0,0 +1,129 @@
+import math
+import time
+from array import array
+
+PAUSE_THRESHOLD = 1.0  # Seconds between keystrokes that count as a pause instead of typing rhythm
+ALIGNMENT_BAND = 8  # Max drift (in characters) between typed text and prompt tracked by the alignment
+_INF = 1 << 20
+
+class KeystrokeRecorder:
+    """
+    Captures typing telemetry from a TextField's on_change events against a prompt sentence.
+    Everything is updated incrementally per event, so snapshot() at submit time is O(1):
+    - keystroke timestamps in a compact array, with running inter-key interval mean/variance (Welford),
+      pause count/time and backspace count;
+    - a banded Levenshtein alignment against the prompt, one DP row per typed character, so a
+      skipped or extra character costs one error instead of shifting every later character.
+    """
+    def __init__(self, prompt, band=ALIGNMENT_BAND, pause_threshold=PAUSE_THRESHOLD):
+        self.prompt = prompt
+        self.band = band
+        self.pause_threshold = pause_threshold
+        self.reset()
+
+    def reset(self):
+        self.times = array('d')  # One timestamp per change event (keystroke)
+        self.text = []
+        self._value = ""  # Last TextField value seen
+        self._words = array('H')  # Running word count after each typed character
+        self._rows = [(0, array('l', range(min(len(self.prompt), self.band) + 1)))]  # (first column, DP row); row 0 = distance to each prompt prefix
+        self.backspaces = 0
+        self.pauses = 0
+        self.pause_time = 0.0
+        self._iki_n = 0
+        self._iki_mean = 0.0
+        self._iki_m2 = 0.0
+
+    # --- Event handling ---
+    def on_change(self, value, now=None):
+        """Feeds the TextField's current value; works out what was typed or deleted since the last event."""
+        now = time.perf_counter() if now is None else now
+        value = value or ""
+        old_len = len(self.text)
+        # Nearly always the edit is at the end, which a single C-level prefix comparison confirms
+        if value.startswith(self._value):
+            common = old_len
+        else:
+            common, limit = 0, min(old_len, len(value))
+            while common < limit and value[common] == self._value[common]:
+                common += 1
+        if value == self._value:
+            return  # No text change (e.g. focus or selection event)
+        if len(value) < old_len:
+            self.backspaces += 1
+        self._record_time(now)
+        while len(self.text) > common:
+            self._pop()
+        for ch in value[common:]:
+            self._push(ch)
+        self._value = value
+
+    def _record_time(self, now):
+        if self.times:
+            interval = now - self.times[-1]
+            if interval >= self.pause_threshold:
+                self.pauses += 1
+                self.pause_time += interval
+            else:
+                self._iki_n += 1
+                delta = interval - self._iki_mean
+                self._iki_mean += delta / self._iki_n
+                self._iki_m2 += delta * (interval - self._iki_mean)
+        self.times.append(now)
+
+    def _push(self, ch):
+        prev_words = self._words[-1] if self._words else 0
+        starts_word = not ch.isspace() and (not self.text or self.text[-1].isspace())
+        self.text.append(ch)
+        self._words.append(min(prev_words + (1 if starts_word else 0), 0xFFFF))
+        # Next DP row: cell j is the edit distance between the typed text and prompt[:j], only for |i - j| <= band
+        # (the last column is always kept so typing past the end of the prompt keeps counting errors)
+        i, band, prompt = len(self.text), self.band, self.prompt
+        prev_lo, prev = self._rows[-1]
+        lo, hi = min(max(0, i - band), len(prompt)), min(len(prompt), i + band)
+        row = array('l', [_INF]) * (hi - lo + 1)
+        for j in range(lo, hi + 1):
+            best = _INF
+            if prev_lo <= j < prev_lo + len(prev):
+                best = prev[j - prev_lo] + 1  # Extra typed character
+            if j > lo:
+                best = min(best, row[j - 1 - lo] + 1)  # Skipped prompt character
+            if j > 0 and prev_lo <= j - 1 < prev_lo + len(prev):
+                best = min(best, prev[j - 1 - prev_lo] + (ch != prompt[j - 1]))  # Match / substitution
+            row[j - lo] = best
+        self._rows.append((lo, row))
+
+    def _pop(self):
+        self.text.pop()
+        self._words.pop()
+        self._rows.pop()
+
+    # --- Features ---
+    @property
+    def errors(self):
+        """Edit distance between the typed text and the best-matching prefix of the prompt."""
+        if not self.text:
+            return 0
+        best = min(self._rows[-1][1])
+        # If typing drifted outside the band, fall back to a pessimistic count
+        return best if best < _INF else len(self.text)
+
+    def snapshot(self):
+        """Returns the typing features for the text so far (all O(1))."""
+        duration = self.times[-1] - self.times[0] if len(self.times) > 1 else 0.0
+        words = self._words[-1] if self._words else 0
+        errors = self.errors
+        keystrokes = len(self.times)
+        return {
+            "wpm": (words / duration * 60) if duration > 0 else 0.0,
+            "errors": errors,
+            "error_rate": (errors / len(self.prompt)) * 100 if self.text and self.prompt else 0.0,
+            "chars": len(self.text),
+            "duration": duration,
+            "keystrokes": keystrokes,
+            "iki_mean": self._iki_mean,
+            "iki_std": math.sqrt(self._iki_m2 / (self._iki_n - 1)) if self._iki_n > 1 else 0.0,
+            "pauses": self.pauses,
+            "pause_time": self.pause_time,
+            "backspace_rate": self.backspaces / keystrokes if keystrokes else 0.0,
+        }
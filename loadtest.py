@@ -0,0 +1,108 @@
+"""
+Load test for server mode: simulates N concurrent check-ins against one shared DetectionPool.
+
+    python loadtest.py [--sessions 32] [--checkins 4] [--image face.jpg] [--workers 4 | --scale]
+
+Each simulated session runs its check-ins through the same CheckinJob path as the app: the pipeline
+replays a typing test through mood_engine, runs the snapshot analysis as a stage on the shared pool
+(as the web UI does after an upload) and classifies the result. Reports p50/p99 check-in latency,
+throughput and how many check-ins lost face analysis to a "busy" pool or a stage timeout.
+--scale repeats the run for 1, 2, 4, ... up to the CPU count workers to show how throughput scales with cores.
+Without --image a synthetic 640x480 frame is used (no face, but the cascade still scans all of it).
+"""
+import argparse
+import os
+import threading
+import time
+
+import mood_engine
+from checkin_pipeline import CheckinJob, StageTimeout, make_checkin_executors
+from detection_pool import DetectionPool, PoolBusy
+from replay_bench import percentile
+
+PROMPT = "Sphinx of black quartz, judge my vow."
+STAGE_TIMEOUT = 5.0  # As FACE_STAGE_TIMEOUT in the app
+
+def synthetic_snapshot():
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (9, 9), 0)  # Smooth noise compresses (and detects) more like a photo
+    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return jpeg.tobytes()
+
+def typing_events(prompt, interval=0.2):
+    """One on_change event per character, as if typed at a steady pace."""
+    return [(i * interval, prompt[:i]) for i in range(1, len(prompt) + 1)]
+
+def checkin_pipeline(job, pool, image_bytes, events):
+    """Mirrors the app's run_checkin_pipeline in server mode; returns how the face stage ended."""
+    typing = mood_engine.replay_keystrokes(PROMPT, events)
+    face_mood, outcome = None, "ok"
+    try: face_mood = job.run_stage("Analyzing snapshot...", pool.detect, image_bytes, STAGE_TIMEOUT, timeout=STAGE_TIMEOUT + 1)
+    except PoolBusy: outcome = "busy"
+    except StageTimeout: outcome = "timeout"
+    except Exception: outcome = "error"
+    mood_engine.evaluate_checkin(typing, face_mood, 50.0, 4.0)
+    return outcome
+
+def simulate_session(pool, executors, image_bytes, checkins, results, lock):
+    events = typing_events(PROMPT)
+    for _ in range(checkins):
+        started = time.perf_counter()
+        outcome = CheckinJob(**executors).start(checkin_pipeline, pool, image_bytes, events).future.result()
+        with lock:
+            results.append((outcome, time.perf_counter() - started))
+
+def run(workers, sessions, checkins, image_bytes, max_pending=None, max_sessions=None):
+    pool = DetectionPool(workers, max_pending)
+    executors = make_checkin_executors(max_sessions or sessions)
+    try:
+        pool.warm_up()  # Process start-up and cascade loading are not part of a check-in
+        results, lock = [], threading.Lock()
+        threads = [threading.Thread(target=simulate_session, args=(pool, executors, image_bytes, checkins, results, lock)) for _ in range(sessions)]
+        started = time.perf_counter()
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        wall = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+        for executor in executors.values(): executor.shutdown(wait=False)
+    latencies = [seconds * 1000 for outcome, seconds in results if outcome == "ok"]
+    return {"workers": pool.workers, "max_pending": pool.max_pending, "completed": len(latencies), "wall": wall,
+            "busy": sum(1 for outcome, _ in results if outcome == "busy"),
+            "timeouts": sum(1 for outcome, _ in results if outcome == "timeout"),
+            "errors": sum(1 for outcome, _ in results if outcome == "error"),
+            "throughput": len(latencies) / wall if wall else 0.0,
+            "p50": percentile(latencies, 50), "p99": percentile(latencies, 99)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32, help="Concurrent simulated users")
+    parser.add_argument("--checkins", type=int, default=4, help="Check-ins per user, back to back")
+    parser.add_argument("--image", help="Snapshot to upload (default: synthetic frame)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Detection worker processes")
+    parser.add_argument("--max-pending", type=int, default=None, help="Pool queue bound (default: 4 per worker); set it low to see backpressure")
+    parser.add_argument("--max-sessions", type=int, default=None, help="Check-in threads, as --max-sessions in the app (default: --sessions)")
+    parser.add_argument("--scale", action="store_true", help="Run with 1, 2, 4, ... CPU-count workers")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f: image_bytes = f.read()
+    else:
+        image_bytes = synthetic_snapshot()
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)}) if args.scale else [args.workers]
+
+    print(f"{args.sessions} sessions x {args.checkins} check-ins, snapshot {len(image_bytes) / 1024:.0f} KB, {cores} CPUs")
+    print(f"{'workers':>8}{'done':>7}{'busy':>7}{'timeouts':>10}{'errors':>8}{'ckin/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'speedup':>9}")
+    base = None
+    for workers in worker_counts:
+        r = run(workers, args.sessions, args.checkins, image_bytes, args.max_pending, args.max_sessions)
+        base = base or r["throughput"]
+        speedup = r["throughput"] / base if base else 0.0
+        print(f"{r['workers']:>8}{r['completed']:>7}{r['busy']:>7}{r['timeouts']:>10}{r['errors']:>8}{r['throughput']:>9.1f}{r['p50']:>10.1f}{r['p99']:>10.1f}{speedup:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
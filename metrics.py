@@ -0,0 +1,147 @@
+"""
+Lightweight hot-path instrumentation: counters and latency histograms, exportable as JSON or
+Prometheus text. Disabled by default; set EMOBOOST_METRICS=1 (or call enable()) to collect.
+When disabled, timer() hands back a shared no-op object and inc()/observe() return immediately.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds (last bucket is +Inf)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+enabled = os.environ.get("EMOBOOST_METRICS") == "1"
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> Histogram
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS + (self.max,), self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _Timer:
+    __slots__ = ("key", "started")
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc, tb): return False
+
+_NULL_TIMER = _NullTimer()
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+def _observe(key, value):
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(value)
+
+# --- Recording API ---
+def enable(on=True):
+    global enabled
+    enabled = on
+
+def timer(name, **labels):
+    """Context manager that records the duration of its block into histogram `name`."""
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(_key(name, labels))
+
+def observe(name, seconds, **labels):
+    if enabled:
+        _observe(_key(name, labels), seconds)
+
+def inc(name, amount=1, **labels):
+    if not enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+# --- Export ---
+def _label_text(labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+def snapshot():
+    """Returns {"counters": {...}, "histograms": {...}} keyed by metric name with labels."""
+    with _lock:
+        counters = {name + _label_text(labels): value for (name, labels), value in sorted(_counters.items())}
+        histograms = {
+            name + _label_text(labels): {"count": h.count, "sum": h.sum, "min": h.min, "max": h.max,
+                                         "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+            for (name, labels), h in sorted(_histograms.items())
+        }
+    return {"enabled": enabled, "counters": counters, "histograms": histograms}
+
+def to_prometheus():
+    lines, typed = [], set()
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            if name not in typed: typed.add(name); lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_label_text(labels)} {value}")
+        for (name, labels), h in sorted(_histograms.items()):
+            if name not in typed: typed.add(name); lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labels)} {h.sum}")
+            lines.append(f"{name}_count{_label_text(labels)} {h.count}")
+    return "\n".join(lines) + "\n"
+
+def dump(path):
+    """Writes the current metrics to `path`: Prometheus text for .prom/.txt, JSON otherwise."""
+    text = to_prometheus() if path.endswith((".prom", ".txt")) else json.dumps(snapshot(), indent=2)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
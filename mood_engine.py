@@ -0,0 +1,75 @@
+"""
+Headless mood-classification core: typing features, baseline comparison, face detection and
+action selection. Nothing here depends on Flet or a live webcam, so it can be driven by the
+app, by replay_bench.py, or from a test script.
+"""
+from keystrokes import KeystrokeRecorder
+
+# Baseline comparison thresholds (relative to the calibrated baseline)
+SLOWER_RATIO = 0.75  # wpm below this fraction of baseline counts as slower
+FASTER_RATIO = 0.50  # wpm above this fraction of baseline counts as faster
+SLOPPY_RATIO = 2.0  # error rate above this multiple of baseline counts as sloppy...
+SLOPPY_MIN_ERROR_RATE = 5.0  # ...as long as it is also above this many percent
+ACCURATE_RATIO = 0.7  # error rate below this fraction of baseline counts as accurate
+MIN_BASELINE_ERROR_RATE = 1.0  # Floor for a perfect calibration run, so ratios stay meaningful
+
+def replay_keystrokes(prompt, events):
+    """Runs a recorded keystroke log [(timestamp, field_value), ...] through a KeystrokeRecorder and returns its features."""
+    recorder = KeystrokeRecorder(prompt)
+    for timestamp, value in events:
+        recorder.on_change(value, timestamp)
+    return recorder.snapshot()
+
+def calibrate(wpm, error_rate):
+    """Returns the (baseline_wpm, baseline_error_rate) for a calibration run."""
+    return wpm, error_rate if error_rate > 0 else MIN_BASELINE_ERROR_RATE
+
+def classify_typing(wpm, error_rate, baseline_wpm, baseline_error_rate):
+    """
+    Compares a check-in against the baseline and returns "Tired", "Stressed", "Focused" or "Normal".
+    Returns "Calibrated" when there is no baseline yet (this run becomes the baseline).
+    """
+    if baseline_wpm == 0:
+        return "Calibrated"
+    is_slower = wpm < baseline_wpm * SLOWER_RATIO; is_faster = wpm > baseline_wpm * FASTER_RATIO
+    is_sloppy = error_rate > baseline_error_rate * SLOPPY_RATIO and error_rate > SLOPPY_MIN_ERROR_RATE
+    is_accurate = error_rate < baseline_error_rate * ACCURATE_RATIO
+    if is_slower and is_sloppy: return "Tired"
+    elif is_faster and is_sloppy: return "Stressed"
+    elif is_faster and is_accurate: return "Focused"
+    return "Normal"
+
+def detect_face(frames, detector_settings=None, max_frames=30, should_stop=None):
+    """
+    Looks for a face in up to `max_frames` BGR frames and returns the facial mood, or None if no
+    face was seen. Stops early once the detector is stable, or returns None when `should_stop()` is true.
+    """
+    from face_detector import FaceDetector  # Imported lazily so typing-only callers don't need OpenCV
+    detected, _, _ = FaceDetector(**(detector_settings or {})).run(frames, max_frames, should_stop)
+    # Placeholder: In a real app, use a deep learning model for emotion detection here.
+    return "Neutral" if detected else None
+
+def select_actions(mood):
+    """
+    Returns the environment adjustments for a mood as (action, argument) pairs, where action is
+    "brightness" (level %), "playlist" (mood name), "dnd" (None) or "notify" ((title, message)).
+    """
+    if mood == "Stressed":
+        return [("brightness", 30), ("playlist", "Stressed"), ("notify", ("Emoboost: Stress Detected", "We're dimming the lights and opening a calming playlist for you."))]
+    elif mood == "Tired":
+        return [("brightness", 80), ("playlist", "Tired"), ("notify", ("Emoboost: Tiredness Detected", "Let's get some energy! Opening a playlist to wake you up."))]
+    elif mood == "Focused":
+        return [("playlist", "Focused"), ("dnd", None), ("notify", ("Emoboost: Focus Mode", "DND (Focus Assist) enabled for your productivity."))]
+    return []
+
+def evaluate_checkin(typing, face_mood, baseline_wpm, baseline_error_rate):
+    """
+    Classifies one check-in from its typing features and facial mood.
+    Returns {"mood", "face_mood", "baseline": (wpm, error_rate), "actions"}; for a calibration run
+    "baseline" is the new baseline, otherwise it is the one that was compared against.
+    """
+    wpm, error_rate = typing["wpm"], typing["error_rate"]
+    mood = classify_typing(wpm, error_rate, baseline_wpm, baseline_error_rate)
+    # Optionally, combine face_mood with typing mood here
+    baseline = calibrate(wpm, error_rate) if mood == "Calibrated" else (baseline_wpm, baseline_error_rate)
+    return {"mood": mood, "face_mood": face_mood, "baseline": baseline, "actions": select_actions(mood)}
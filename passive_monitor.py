@@ -0,0 +1,268 @@
+"""
+Optional background mood monitoring on a low duty cycle.
+
+Every so often the monitor opens the camera for a few frames and looks at the typing rhythm since the
+last sample, compares both with rolling EWMA baselines and updates the current mood. Samples are rare
+while the signals are stable and frequent when they drift. Each sample's CPU and camera time is measured,
+and the next sample is pushed back far enough to keep the long-run averages under `cpu_budget` and
+`camera_budget` (fractions of wall time).
+"""
+import math
+import threading
+import time
+
+import metrics
+from keystrokes import PAUSE_THRESHOLD
+from mood_engine import MIN_BASELINE_ERROR_RATE, classify_typing, detect_face
+
+# Sampling schedule (seconds)
+MIN_INTERVAL = 60.0
+MAX_INTERVAL = 900.0
+BACKOFF = 1.5  # Interval growth per stable sample
+CPU_BUDGET = 0.02  # Average share of one core
+CAMERA_BUDGET = 0.01  # Average share of wall time with the camera open
+SAMPLE_FRAMES = 5
+MIN_WINDOW_KEYS = 20  # Fewer keystrokes than this in a window say nothing about rhythm
+EWMA_ALPHA = 0.1  # Baselines: slow, roughly the last 10-20 samples
+CURRENT_ALPHA = 0.5  # Current state: fast, so one noisy window does not flip the mood on its own
+WARMUP_SAMPLES = 5  # Samples folded into a baseline before it is used for drift or classification
+DRIFT_Z = 2.0
+
+
+class Ewma:
+    """Exponentially weighted mean and variance of one signal, in constant space."""
+    __slots__ = ("alpha", "mean", "var", "count")
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self.mean = None
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, x):
+        if self.mean is None:
+            self.mean = x
+        else:
+            delta = x - self.mean
+            self.mean += self.alpha * delta
+            self.var = (1 - self.alpha) * (self.var + self.alpha * delta * delta)
+        self.count += 1
+
+    @property
+    def ready(self):
+        return self.count >= WARMUP_SAMPLES
+
+    def z(self, x, floor):
+        """How many (EW) standard deviations `x` is from the mean; `floor` keeps a near-constant signal from over-reacting."""
+        if self.mean is None:
+            return 0.0
+        return abs(x - self.mean) / max(math.sqrt(self.var), floor)
+
+
+class RhythmWindow:
+    """
+    Typing rhythm since the last sample, from key timings only (no key contents are kept):
+    keystrokes, backspaces and active typing time (gaps longer than a pause are not counted).
+    """
+    __slots__ = ("keys", "backspaces", "active_time", "_last", "_lock")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.keys = 0
+        self.backspaces = 0
+        self.active_time = 0.0
+        self._last = None
+
+    def on_key(self, backspace=False, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last is not None and now - self._last < PAUSE_THRESHOLD:
+                self.active_time += now - self._last
+            self._last = now
+            self.keys += 1
+            if backspace: self.backspaces += 1
+
+    def take(self):
+        """Returns {"wpm", "error_rate", "keys"} for the window (None if too little was typed) and starts a new one."""
+        with self._lock:
+            keys, backspaces, active = self.keys, self.backspaces, self.active_time
+            self.reset()
+        if keys < MIN_WINDOW_KEYS or active <= 0:
+            return None
+        # Backspaces stand in for errors: the monitor never sees what was typed, only when
+        return {"wpm": (keys - backspaces) / 5.0 / (active / 60.0), "error_rate": backspaces / keys * 100.0, "keys": keys}
+
+
+class KeyTimingSource:
+    """System-wide key timing via the optional pynput package. Only the time and whether it was Backspace are passed on."""
+    def __init__(self, window):
+        self.window = window
+        self._listener = None
+
+    def start(self):
+        try:
+            from pynput import keyboard
+        except ImportError as e:
+            print(f"Could not start typing-rhythm monitoring (pip install pynput). Error: {e}")
+            return False
+        self._listener = keyboard.Listener(on_press=lambda key: self.window.on_key(key == keyboard.Key.backspace))
+        self._listener.daemon = True
+        self._listener.start()
+        return True
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop(); self._listener = None
+
+
+class PassiveMonitor:
+    """
+    Samples the camera and the typing rhythm on an adaptive schedule and keeps a continuously updated mood.
+    - Baselines for wpm, error rate and face presence are slow EWMAs (fixed-size state) learnt from the samples themselves,
+      since all-day typing and backspace rates are not comparable with the calibration sentence. The mood compares
+      a fast EWMA of the recent samples against them, and a new mood is only taken on once two samples in a row agree.
+    - A sample whose signals are all within `drift_z` deviations of their baselines (and whose mood did not change)
+      multiplies the interval by BACKOFF up to `max_interval`; a drifting sample drops it back to `min_interval`.
+    - After each sample the next one waits at least cpu_cost / cpu_budget and camera_time / camera_budget seconds.
+    `on_update(state)` is called from the monitor thread after every sample.
+    """
+    def __init__(self, camera=None, on_update=None, history=None, key_source=True, detector_settings=None,
+                 cpu_budget=CPU_BUDGET, camera_budget=CAMERA_BUDGET, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 sample_frames=SAMPLE_FRAMES, drift_z=DRIFT_Z):
+        if camera is None:
+            from camera_service import camera
+        self.camera = camera
+        self.on_update = on_update
+        self.history = history
+        self.detector_settings = detector_settings
+        self.cpu_budget = cpu_budget
+        self.camera_budget = camera_budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.sample_frames = sample_frames
+        self.drift_z = drift_z
+        self.baselines = {"wpm": Ewma(), "error_rate": Ewma(), "presence": Ewma()}
+        self.current = {name: Ewma(CURRENT_ALPHA) for name in self.baselines}
+        self._candidate = None  # Mood seen once, waiting for the next sample to confirm it
+        self.window = RhythmWindow()
+        self.keys = KeyTimingSource(self.window) if key_source else None
+        self.interval = min_interval
+        self.state = {"mood": None, "face": None, "typing": None, "drift": False, "next_sample": None}
+        self.stats = {"samples": 0, "cpu_seconds": 0.0, "camera_seconds": 0.0, "started": None}
+        self._stop = threading.Event()  # Replaced on every start(), so a stopped sampler can never be revived
+        self._sampling = threading.Lock()  # One sample at a time, even while a stopped sampler winds down
+        self._thread = None
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.keys is not None: self.keys.start()
+        self._stop = threading.Event()
+        self.stats["started"] = time.monotonic()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="emoboost-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Signals the sampler and returns at once (safe to call from a UI handler); a sample in progress is discarded."""
+        self._stop.set()
+        if self.keys is not None: self.keys.stop()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    @property
+    def cpu_share(self):
+        """Average CPU used by sampling so far, as a share of wall time since start()."""
+        if not self.stats["started"]:
+            return 0.0
+        return self.stats["cpu_seconds"] / max(time.monotonic() - self.stats["started"], 1e-9)
+
+    def _run(self, stop):
+        delay = min(self.min_interval, 5.0)  # First look shortly after switching on
+        while not stop.wait(delay):
+            try: delay = self.sample(stop)
+            except Exception as e:
+                print(f"Passive monitoring sample failed. Error: {e}")
+                delay = self.max_interval
+
+    # --- Sampling ---
+    def _sample_face(self, stop):
+        """Returns (face_mood or None, face seen, camera seconds); face seen is None when there is no camera."""
+        started = time.monotonic()
+        try: self.camera.acquire()
+        except RuntimeError as e:
+            print(f"Passive monitoring: camera unavailable. Error: {e}")
+            return None, None, time.monotonic() - started
+        try:
+            mood = detect_face(self.camera.frames(self.sample_frames), self.detector_settings, max_frames=self.sample_frames, should_stop=stop.is_set)
+        finally:
+            self.camera.release()
+        return mood, mood is not None, time.monotonic() - started
+
+    def sample(self, stop=None):
+        """
+        Takes one sample, updates the mood and baselines, and returns the seconds until the next sample.
+        Returns None without changing anything if `stop` is set while sampling.
+        """
+        stop = stop or threading.Event()
+        with self._sampling:
+            if stop.is_set():
+                return None
+            return self._sample(stop)
+
+    def _sample(self, stop):
+        cpu_started = time.process_time()  # Whole process, so concurrent UI work is charged too (conservative)
+        with metrics.timer("monitor_sample_seconds"):
+            face_mood, face_seen, camera_time = self._sample_face(stop) if self.camera_budget > 0 else (None, None, 0.0)
+            if stop.is_set():
+                return None
+            typing = self.window.take()
+
+            drift = False
+            signals = {}
+            if face_seen is not None: signals["presence"] = (1.0 if face_seen else 0.0, 0.25)
+            if typing is not None:
+                signals["wpm"] = (typing["wpm"], max(2.0, 0.05 * (self.baselines["wpm"].mean or 0.0)))
+                signals["error_rate"] = (typing["error_rate"], MIN_BASELINE_ERROR_RATE)
+            for name, (value, floor) in signals.items():
+                if self.baselines[name].ready and self.baselines[name].z(value, floor) > self.drift_z:
+                    drift = True
+
+            for name, (value, _) in signals.items():
+                self.current[name].update(value)
+            mood = self.state["mood"]
+            wpm_base, err_base = self.baselines["wpm"], self.baselines["error_rate"]
+            if typing is not None and wpm_base.ready and err_base.ready:
+                seen = classify_typing(self.current["wpm"].mean, self.current["error_rate"].mean, wpm_base.mean, max(err_base.mean, MIN_BASELINE_ERROR_RATE))
+                if seen != mood:
+                    drift = True  # Look again soon, either to confirm the change or to discard it
+                    if mood is None or seen == self._candidate: mood, self._candidate = seen, None
+                    else: self._candidate = seen
+                else:
+                    self._candidate = None
+            # Baselines absorb the sample after it has been judged against them
+            for name, (value, _) in signals.items():
+                self.baselines[name].update(value)
+
+        cpu_cost = time.process_time() - cpu_started
+        self.stats["samples"] += 1; self.stats["cpu_seconds"] += cpu_cost; self.stats["camera_seconds"] += camera_time
+        metrics.inc("monitor_samples_total", drift=str(drift).lower())
+
+        self.interval = self.min_interval if drift else min(self.max_interval, self.interval * BACKOFF)
+        delay = max(self.interval, cpu_cost / self.cpu_budget if self.cpu_budget > 0 else 0.0,
+                    camera_time / self.camera_budget if self.camera_budget > 0 else 0.0)
+        self.state = {"mood": mood, "face": face_mood, "typing": typing, "drift": drift, "next_sample": delay}
+        if self.history is not None:
+            values = {"drift": 1.0 if drift else 0.0, "cpu_seconds": cpu_cost, "camera_seconds": camera_time, "next_sample": delay}
+            if face_seen is not None: values["face_seen"] = 1.0 if face_seen else 0.0
+            if typing is not None: values.update(wpm=typing["wpm"], error_rate=typing["error_rate"])
+            self.history.add_metrics("passive", values)
+        if self.on_update is not None:
+            self.on_update(self.state)
+        return delay
@@ -0,0 +1,99 @@
+import base64
+import cv2
+import numpy as np
+import metrics
+
+class PreviewEncoder:
+    """
+    Turns camera frames into base64 JPEG strings for the live preview.
+    - Encodes straight from the BGR NumPy frame with cv2.imencode (no RGB/PIL/BytesIO round trip).
+    - Reuses its resize and thumbnail buffers between frames.
+    - Skips frames that are nearly identical to the last one sent.
+    - Adapts fps and JPEG quality to the measured encode + UI update cost.
+    """
+    THUMB_SIZE = (32, 24)  # Tiny grayscale copy used for change detection
+
+    def __init__(self, size=(320, 240), quality=70, min_quality=40, max_quality=85,
+                 max_fps=20.0, min_fps=4.0, diff_threshold=2.0, keyframe_interval=2.0):
+        self.size = size
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.fps = max_fps
+        self.diff_threshold = diff_threshold  # Mean absolute thumbnail difference (0-255) below which a frame is skipped
+        self.keyframe_interval = keyframe_interval  # Always resend at least this often, even if nothing changed
+
+        w, h = size
+        tw, th = self.THUMB_SIZE
+        self._resized = np.empty((h, w, 3), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._thumb = np.empty((th, tw), dtype=np.uint8)
+        self._last_thumb = np.empty((th, tw), dtype=np.uint8)
+        self._diff = np.empty((th, tw), dtype=np.uint8)
+        self._has_last = False
+        self._last_sent_at = 0.0
+        self._cost = None  # EWMA of encode + update seconds per sent frame
+
+        # Counters for diagnostics / benchmarks
+        self.sent = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    @property
+    def frame_interval(self):
+        return 1.0 / self.fps
+
+    def _changed(self, now):
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.resize(self._gray, self.THUMB_SIZE, dst=self._thumb, interpolation=cv2.INTER_AREA)
+        if self._has_last and now - self._last_sent_at < self.keyframe_interval:
+            cv2.absdiff(self._thumb, self._last_thumb, dst=self._diff)
+            if cv2.mean(self._diff)[0] < self.diff_threshold:
+                return False
+        self._thumb, self._last_thumb = self._last_thumb, self._thumb
+        self._has_last = True
+        return True
+
+    def encode(self, frame, now):
+        """Returns the frame as a base64 JPEG string, or None if it is close enough to the last one sent."""
+        with metrics.timer("preview_encode_seconds"):
+            return self._encode(frame, now)
+
+    def _encode(self, frame, now):
+        cv2.resize(frame, self.size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        if not self._changed(now):
+            self.skipped += 1
+            metrics.inc("preview_skipped_frames_total")
+            return None
+        ok, jpeg = cv2.imencode(".jpg", self._resized, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ok:
+            return None
+        self.sent += 1
+        self._last_sent_at = now
+        return base64.b64encode(jpeg).decode("ascii")
+
+    def record_cost(self, seconds):
+        """
+        Feeds back how long the last sent frame took (encode + UI update) and adapts fps/quality.
+        When the cost eats into the frame budget, fps is lowered first and then quality; when
+        there is headroom, quality is restored first and then fps.
+        """
+        self._cost = seconds if self._cost is None else 0.8 * self._cost + 0.2 * seconds
+        budget = self.frame_interval
+        if self._cost > 0.5 * budget:
+            if self.fps > self.min_fps:
+                self.fps = max(self.min_fps, self.fps * 0.8)
+            elif self.quality > self.min_quality:
+                self.quality = max(self.min_quality, self.quality - 5)
+        elif self._cost < 0.2 * budget:
+            if self.quality < self.max_quality:
+                self.quality = min(self.max_quality, self.quality + 5)
+            elif self.fps < self.max_fps:
+                self.fps = min(self.max_fps, self.fps * 1.1)
+
+    def reset(self):
+        self._has_last = False
+        self._last_sent_at = 0.0
+        self.sent = self.skipped = self.dropped = 0
@@ -0,0 +1,128 @@
+"""
+Offline replay harness: feeds recorded check-in sessions through mood_engine across a process pool.
+
+    python replay_bench.py sessions.json [--workers 4] [--repeat 10] [--max-frames 30]
+
+sessions.json is a list of sessions; paths are relative to the manifest:
+
+    [{"id": "alice-1", "video": "clips/alice-1.mp4", "keystrokes": "logs/alice-1.json",
+      "baseline": [52.0, 3.5], "expected": "Tired"}, ...]
+
+A keystroke log is {"prompt": "...", "events": [[seconds, field_value], ...]}, i.e. one entry per
+TextField on_change event. "baseline" is optional (omitted = calibration run); "video" is optional
+(omitted = typing only); "expected" is optional and enables the accuracy line.
+Reports throughput, p50/p90/p99 latency per stage and the classification results.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import mood_engine
+
+STAGES = ("typing", "decode", "face", "classify", "total")
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100.0 * len(ordered)) - 1)]
+
+def load_sessions(manifest_path):
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path) as f:
+        sessions = json.load(f)
+    for session in sessions:
+        for key in ("video", "keystrokes"):
+            if session.get(key):
+                session[key] = os.path.join(base, session[key])
+    return sessions
+
+def _timed_frames(path, timings):
+    """Yields frames from a video file, adding the decode time to timings["decode"]."""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        while True:
+            started = time.perf_counter()
+            ret, frame = cap.read()
+            timings["decode"] += time.perf_counter() - started
+            if not ret:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+def replay_session(session, max_frames=30, detector_settings=None):
+    """Runs one recorded session through the engine (in a worker process) and returns its result and stage timings."""
+    timings = dict.fromkeys(STAGES, 0.0)
+    total_started = time.perf_counter()
+
+    started = time.perf_counter()
+    with open(session["keystrokes"]) as f:
+        log = json.load(f)
+    typing = mood_engine.replay_keystrokes(log.get("prompt") or session.get("prompt", ""), log["events"])
+    timings["typing"] = time.perf_counter() - started
+
+    face_mood = None
+    if session.get("video"):
+        started = time.perf_counter()
+        face_mood = mood_engine.detect_face(_timed_frames(session["video"], timings), detector_settings, max_frames=max_frames)
+        timings["face"] = time.perf_counter() - started - timings["decode"]
+
+    started = time.perf_counter()
+    baseline = session.get("baseline") or (0.0, 0.0)
+    result = mood_engine.evaluate_checkin(typing, face_mood, *baseline)
+    timings["classify"] = time.perf_counter() - started
+
+    timings["total"] = time.perf_counter() - total_started
+    return {"id": session.get("id"), "mood": result["mood"], "face_mood": face_mood,
+            "expected": session.get("expected"), "wpm": typing["wpm"], "error_rate": typing["error_rate"], "timings": timings}
+
+def _replay(args):
+    return replay_session(*args)
+
+def report(results, wall):
+    n = len(results)
+    print(f"Replayed {n} sessions in {wall:.2f}s -> {n / wall:.1f} sessions/s")
+    print(f"{'stage':<10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        values = [r["timings"][stage] * 1000 for r in results]
+        print(f"{stage:<10}{percentile(values, 50):>10.2f}{percentile(values, 90):>10.2f}{percentile(values, 99):>10.2f}")
+    print("Moods:", dict(Counter(r["mood"] for r in results)))
+    print("Face:", dict(Counter(r["face_mood"] or "none" for r in results)))
+    labelled = [r for r in results if r["expected"]]
+    if labelled:
+        correct = sum(1 for r in labelled if r["mood"] == r["expected"])
+        print(f"Accuracy: {correct}/{len(labelled)} ({correct / len(labelled):.1%})")
+        misses = Counter((r["id"], r["expected"], r["mood"]) for r in labelled if r["mood"] != r["expected"])
+        for (session_id, expected, got), count in misses.most_common(10):
+            print(f"  {session_id}: expected {expected}, got {got} (x{count})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("manifest", help="JSON list of recorded sessions")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the whole manifest this many times")
+    parser.add_argument("--max-frames", type=int, default=30, help="Frames read per video, as in a live check-in")
+    parser.add_argument("--json", help="Also write per-session results to this file")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.manifest) * args.repeat
+    jobs = [(session, args.max_frames, None) for session in sessions]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(_replay, jobs, chunksize=max(1, len(jobs) // (args.workers * 4))))
+    wall = time.perf_counter() - started
+    print(f"Workers: {args.workers}")
+    report(results, wall)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from action_dispatcher import ActionDispatcher, FakeBackend
+from mood_engine import select_actions
+
+PLAYLISTS = {"Stressed": "https://example.com/stressed", "Focused": "https://example.com/focused"}
+
+
+def make_dispatcher(backend=None, **kwargs):
+    kwargs.setdefault("debounce", 0.02)
+    kwargs.setdefault("ramp_interval", 0.0)
+    return ActionDispatcher(backend or FakeBackend(), PLAYLISTS, **kwargs)
+
+
+def run(dispatcher, *batches):
+    for batch in batches:
+        dispatcher.submit(batch)
+    assert dispatcher.wait_idle(5)
+    dispatcher.close()
+    return dispatcher.backend.calls
+
+
+def test_repeated_actions_are_skipped():
+    dispatcher = make_dispatcher(FakeBackend(brightness=30))
+    dispatcher.submit([("brightness", 30), ("playlist", "Focused"), ("dnd", None)]); assert dispatcher.wait_idle(5)
+    calls = run(dispatcher, [("playlist", "Focused"), ("dnd", None)])
+    assert calls == [("open_url", PLAYLISTS["Focused"]), ("dnd",)]
+    assert dispatcher.stats["skipped"] == 3  # Brightness already 30, then playlist and DND still in effect
+
+
+def test_dnd_is_reapplied_after_it_expires():
+    dispatcher = make_dispatcher(dnd_ttl=0.0)
+    dispatcher.submit([("dnd", None)]); assert dispatcher.wait_idle(5)
+    assert run(dispatcher, [("dnd", None)]) == [("dnd",), ("dnd",)]
+
+
+def test_same_notification_within_cooldown_is_sent_once():
+    dispatcher = make_dispatcher()
+    message = ("Emoboost", "Take a break")
+    dispatcher.submit([("notify", message)]); assert dispatcher.wait_idle(5)
+    calls = run(dispatcher, [("notify", message)])
+    assert calls == [("notify", *message)]
+
+
+def test_burst_applies_latest_batch_whole():
+    dispatcher = make_dispatcher(FakeBackend(brightness=50), debounce=0.2)
+    calls = run(dispatcher, select_actions("Stressed"), select_actions("Focused"))
+    assert not any(call[0] == "brightness" for call in calls)  # Focused does not touch brightness
+    assert ("open_url", PLAYLISTS["Stressed"]) not in calls
+    assert ("open_url", PLAYLISTS["Focused"]) in calls and ("dnd",) in calls
+
+
+def test_steady_stream_is_applied_within_max_wait():
+    dispatcher = make_dispatcher(debounce=0.2, max_wait=0.3)
+    started = time.monotonic()
+    while time.monotonic() - started < 1.0 and not dispatcher.backend.calls:
+        dispatcher.submit([("playlist", "Focused")])
+        time.sleep(0.05)
+    assert dispatcher.backend.calls, "actions were postponed for the whole stream"
+    dispatcher.close()
+
+
+def test_slow_backend_call_times_out():
+    dispatcher = make_dispatcher(FakeBackend(delay=0.3), timeout=0.05)
+    run(dispatcher, [("dnd", None), ("playlist", "Focused")])
+    assert dispatcher.stats["timed_out"] == 2
+    assert dispatcher.stats["failed"] == 2
+    assert dispatcher.stats["applied"] == 0
+
+
+def test_hung_backend_calls_do_not_block_later_actions():
+    class HangingBackend(FakeBackend):
+        def open_url(self, url):
+            threading.Event().wait()  # Never returns, like a stuck webbrowser.open
+
+    dispatcher = make_dispatcher(HangingBackend(), timeout=0.1)
+    dispatcher.submit([("playlist", "Stressed")]); assert dispatcher.wait_idle(5)
+    dispatcher.submit([("playlist", "Focused")]); assert dispatcher.wait_idle(5)
+    dispatcher.submit([("notify", ("Emoboost", "One"))]); assert dispatcher.wait_idle(5)
+    calls = run(dispatcher, [("notify", ("Emoboost", "Two"))])
+    assert dispatcher.stats["timed_out"] == 2
+    assert calls == [("notify", "Emoboost", "One"), ("notify", "Emoboost", "Two")]
+
+
+def test_brightness_ramps_in_steps():
+    calls = run(make_dispatcher(FakeBackend(brightness=50), ramp_steps=5), [("brightness", 30)])
+    assert calls == [("brightness", level) for level in (46, 42, 38, 34, 30)]
+
+
+def test_brightness_changed_by_hand_is_reapplied():
+    backend = FakeBackend(brightness=50)
+    dispatcher = make_dispatcher(backend, ramp_steps=1)
+    dispatcher.submit([("brightness", 30)]); assert dispatcher.wait_idle(5)
+    backend.brightness = 70  # User turned it back up
+    calls = run(dispatcher, [("brightness", 30)])
+    assert calls == [("brightness", 30), ("brightness", 30)]
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import re
+import threading
+from history_store import HistoryStore, DB_PATH
+
+# Server mode keeps each user's files under DATA_DIR/<user id>/
+DATA_DIR = "emoboost-data"
+CONSENT_FILE = "consent.txt"
+
+class UserState:
+    """
+    Files and stores owned by one user: their consent flag and their history database.
+    Shared by every session (browser tab) of that user; closed when the last session ends.
+    """
+    def __init__(self, user_id, directory):
+        self.user_id = user_id
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.consent_path = os.path.join(directory, CONSENT_FILE)
+        self.history = HistoryStore(os.path.join(directory, DB_PATH))
+        self.sessions = 0
+
+    @property
+    def has_consent(self):
+        return os.path.exists(self.consent_path)
+
+    def give_consent(self):
+        with open(self.consent_path, "w") as f: f.write("accepted")
+
+    def revoke_consent(self):
+        if os.path.exists(self.consent_path): os.remove(self.consent_path)
+
+
+_users = {}
+_users_lock = threading.Lock()
+
+def safe_user_id(user_id):
+    """Keeps ids that are safe as directory names; anything else is replaced by a hash."""
+    user_id = str(user_id)
+    if re.fullmatch(r"[A-Za-z0-9_-]{1,64}", user_id):
+        return user_id
+    return hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+
+def acquire_user_state(user_id=None):
+    """
+    Returns the UserState for `user_id`, creating it on first use, and registers a session on it.
+    With no user id (desktop mode) the single local user keeps its files in the working directory.
+    """
+    key = safe_user_id(user_id) if user_id is not None else None
+    with _users_lock:
+        state = _users.get(key)
+        if state is None:
+            state = _users[key] = UserState(key or "local", os.path.join(DATA_DIR, key) if key else ".")
+        state.sessions += 1
+        return state
+
+def release_user_state(state):
+    """Unregisters a session; the user's history store is closed once their last session has gone."""
+    key = None if state.directory == "." else state.user_id
+    with _users_lock:
+        state.sessions -= 1
+        if state.sessions > 0 or _users.get(key) is not state:
+            return
+        del _users[key]
+    state.history.close()